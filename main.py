@@ -1,11 +1,36 @@
+import argparse
 from pathlib import Path
 
-from screen_time_tracker.app import ScreenTimeApp
+from screen_time_tracker.startup import profile
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Screen time tracker")
+    parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        help="start up, print per-stage init and per-module import times, then exit",
+    )
+    args = parser.parse_args()
+    if args.startup_profile:
+        profile.trace_imports()
+
+    with profile.stage("import app"):
+        from screen_time_tracker.app import ScreenTimeApp
+
     app = ScreenTimeApp()
-    app.start()
+    if not args.startup_profile:
+        app.start()
+        return
+
+    app.start(block=False)
+    app.services_ready.wait(60)
+    profile.stop_tracing()
+    print(profile.format())
+    report_path = Path(app.data_dir) / "startup-profile.json"
+    report_path.write_text(profile.dumps(), encoding="utf-8")
+    print(f"\nSaved to {report_path}")
+    app.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,117 @@
+"""Read-only localhost HTTP API over the tracker's published snapshots.
+
+``GET /usage``
+    ``{"version", "day", "active_seconds", "per_exe_seconds"}``
+``GET /top?n=10``
+    ``{"version", "day", "apps": [[app, seconds], ...]}`` (at most ``report_top_apps``)
+``GET /timeline``
+    ``{"version", "day", "intervals": [[start, end, exe], ...]}`` (epoch seconds)
+
+Every response carries the snapshot version as its ``ETag``; a poll with a
+matching ``If-None-Match`` gets an empty ``304``. Encoded bodies are cached
+per version, so a dashboard polling every second costs one dict lookup
+until the tracker publishes a new snapshot.
+"""
+
+import json
+import threading
+import time
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from . import metrics
+from .tracker import ActivitySnapshot, ActivityTracker
+
+TOP_DEFAULT = 10
+
+API_REQUESTS = metrics.registry.counter("api_requests_total", "Query API requests")
+API_NOT_MODIFIED = metrics.registry.counter("api_not_modified_total", "Query API requests answered with 304")
+
+
+def usage_body(snap: ActivitySnapshot) -> Dict:
+    return {
+        "version": snap.version,
+        "day": snap.day.isoformat(),
+        "active_seconds": round(snap.active_seconds, 1),
+        "per_exe_seconds": {exe: round(seconds, 1) for exe, seconds in (snap.per_exe_seconds or {}).items()},
+    }
+
+
+def top_body(snap: ActivitySnapshot, n: int) -> Dict:
+    ranked = sorted(snap.per_app_seconds.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "version": snap.version,
+        "day": snap.day.isoformat(),
+        "apps": [[app, round(seconds, 1)] for app, seconds in ranked[:n]],
+    }
+
+
+def timeline_body(snap: ActivitySnapshot) -> Dict:
+    intervals = list(snap.timeline.intervals()) if snap.timeline is not None else []
+    return {
+        "version": snap.version,
+        "day": snap.day.isoformat(),
+        "intervals": [[round(start, 1), round(end, 1), app] for start, end, app in intervals],
+    }
+
+
+class QueryServer(metrics.LocalHTTPServer):
+    """Serves live usage from :meth:`ActivityTracker.snapshot` on localhost."""
+
+    def __init__(self, tracker: ActivityTracker, port: int, host: str = "127.0.0.1") -> None:
+        self.tracker = tracker
+        self._cache: Dict[Tuple[str, int], bytes] = {}
+        self._cache_version = -1
+        # Versions restart with the process; keep ETags from before a restart from matching.
+        self._epoch = int(time.time())
+        self._lock = threading.Lock()
+        super().__init__(port, host)
+
+    def _etag(self, version: int) -> str:
+        return f'"{self._epoch}-{version}"'
+
+    def body(self, snap: ActivitySnapshot, path: str, n: int) -> bytes:
+        key = (path, n)
+        with self._lock:
+            if self._cache_version != snap.version:
+                self._cache.clear()
+                self._cache_version = snap.version
+            cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        if path == "/usage":
+            result = usage_body(snap)
+        elif path == "/top":
+            result = top_body(snap, n)
+        else:
+            result = timeline_body(snap)
+        encoded = json.dumps(result).encode("utf-8")
+        with self._lock:
+            if self._cache_version == snap.version:
+                self._cache[key] = encoded
+        return encoded
+
+    def do_GET(self, request) -> None:
+        API_REQUESTS.inc()
+        url = urlsplit(request.path)
+        if url.path not in ("/usage", "/top", "/timeline"):
+            request.send_error(404)
+            return
+        try:
+            n = int(parse_qs(url.query).get("n", [TOP_DEFAULT])[0]) if url.path == "/top" else 0
+        except ValueError:
+            request.send_error(400)
+            return
+        # An unchanged version is answered before the tracker is asked to build a snapshot.
+        current = self._etag(self.tracker.version)
+        if request.headers.get("If-None-Match") == current:
+            API_NOT_MODIFIED.inc()
+            request.send_response(304)
+            request.send_header("ETag", current)
+            request.end_headers()
+            return
+        snap = self.tracker.snapshot()
+        etag = self._etag(snap.version)
+        # Snapshots hold at most report_top_apps titles; clamping also bounds the cache to one entry per n.
+        body = self.body(snap, url.path, min(max(n, 0), self.tracker.top_apps))
+        self.reply(request, body, headers={"ETag": etag, "Cache-Control": "no-cache"})
@@ -1,123 +1,483 @@
-import platform
+import logging
+import signal
 import threading
 import time
-from datetime import datetime
+from datetime import date, datetime
 from pathlib import Path
+from typing import Dict, List, Optional, Set
 
-from .config import AppConfig, config_path, load_config
-from .emailer import send_email
+from .config import AppConfig, ConfigWatcher, changed_fields, config_path, load_config, validate_config
+from .history import open_history
 from .i18n import t
+from .metrics import MetricsServer, registry
 from .notifications import Notifier
-from .reporting import format_report_localized
-from .scheduler import Scheduler
-from .screenshots import take_screenshot
+from .profiler import SamplingProfiler
+from .rules import SESSION, WINDOW, BudgetRule, Rule, RuleEngine, load_rules
+from .scheduler import Job, Scheduler
+from .startup import profile
+from .storage import open_store
 from .tracker import ActivityTracker
-from .tray import start_tray
+
+logger = logging.getLogger(__name__)
+
+CONFIG_POLL_SECONDS = 10
+# Config fields whose jobs are rescheduled when they change.
+RESCHEDULE = {
+    "report_time": ("report", "digest"),
+    "digest_enabled": ("digest",),
+    "screenshot_enabled": ("screenshot", "screenshot_maintenance"),
+    "household_upload_minutes": ("household",),
+    "metrics_dump_minutes": ("metrics_dump",),
+}
+# Config fields that feed the built-in limit rules.
+RULE_FIELDS = {"warning_minutes", "soft_limit_minutes", "hard_limit_minutes", "break_interval_minutes", "rules_file"}
+BUILTIN_RULE_TEXT = {
+    "warning": ("notify_warning_title", "notify_warning_body"),
+    "soft_limit": ("notify_soft_limit_title", "notify_soft_limit_body"),
+    "hard_limit": ("notify_hard_limit_title", "notify_hard_limit_body"),
+    "break": ("notify_break_title", "notify_break_body"),
+}
+# Config fields that only take effect after a restart.
+RESTART_REQUIRED = {"data_dir", "screenshot_dir", "household_url", "idle_source", "storage"}
+
+
+def _stat_key(path: Path) -> Optional[tuple]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
 
 
 class ScreenTimeApp:
+    """The tracker plus its services, started in stages.
+
+    Only the config, the tracker and cheap bookkeeping objects are built in
+    ``__init__``; :meth:`start` gets the tracker counting first and then
+    imports and starts the heavy subsystems (email, reports, screenshots,
+    tray) on a background thread, so nothing waits on Pillow or smtplib at
+    login. ``services_ready`` is set once that is done.
+    """
+
     def __init__(self, config_file: Path | None = None) -> None:
         path = config_file or config_path()
-        self.config: AppConfig = load_config(path)
+        with profile.stage("config"):
+            self.config: AppConfig = load_config(path)
+            # Fail here, on the main thread, rather than in a job on the startup thread.
+            validate_config(self.config)
+            self.config_watcher = ConfigWatcher(path)
         self.data_dir = Path(self.config.data_dir)
         self.screenshot_dir = Path(self.config.screenshot_dir)
-        self.tracker = ActivityTracker(self.config.idle_minutes, self.data_dir)
+        with profile.stage("storage"):
+            # The first SQLite start imports the JSON day files.
+            self.store = open_store(self.data_dir, self.config.storage)
+        with profile.stage("tracker.init"):
+            self.tracker = ActivityTracker(
+                self.config.idle_minutes,
+                self.data_dir,
+                input_window=self.config.input_coalesce_ms / 1000,
+                app_capacity=self.config.app_key_limit,
+                top_apps=self.config.report_top_apps,
+                idle_source_name=self.config.idle_source,
+                store=self.store,
+            )
+        self.history = open_history(self.store, self.data_dir)
         self.scheduler = Scheduler()
+        self._jobs: Dict[str, Job] = {}
         self.notifier = Notifier()
+        self.household = None
+        if self.config.household_url:
+            from .household import HouseholdClient
+
+            self.household = HouseholdClient(
+                self.config.household_url,
+                self.config.household_child or self.config.household_machine,
+                self.config.household_machine,
+                self.data_dir / "household_spool.json",
+            )
+            self.tracker.subscribe(self.household.record)
+        # Built by _start_services.
+        self.renderer = None
+        self.outbox = None
+        self.screenshot_store = None
+        self.screenshots = None
+        self.services_ready = threading.Event()
         self.running = False
-        self._soft_limit_notified = False
-        self._hard_limit_notified = False
-        self._warning_notified = False
-        self._break_notice_bucket = 0
+        self.rules = RuleEngine(self._on_rule_fired)
+        self._rules_stat = None
+        self.tracker.subscribe(self.rules.on_delta)
         self.icon = None
+        self.metrics_server = None
+        self.api_server = None
+        self.profiler = SamplingProfiler(self.data_dir, on_finished=self._on_profile_finished)
 
-    def start(self) -> None:
+    def start(self, block: bool = True) -> None:
         self.running = True
-        self.tracker.start()
-        self._setup_schedule()
-        self.icon = start_tray(self.send_daily_report, self.stop, self.data_dir, self.config.language)
-        self.scheduler.start()
+        with profile.stage("tracker.start"):
+            self.tracker.start()
+        with profile.stage("rules"):
+            self._load_rules()
+        self._install_profile_signal()
+        threading.Thread(target=self._start_services, name="startup", daemon=True).start()
+        if not block:
+            return
         try:
             while self.running:
                 time.sleep(1)
         except KeyboardInterrupt:
             self.stop()
 
+    def _start_services(self) -> None:
+        with profile.stage("outbox"):
+            from .outbox import Outbox
+
+            self.outbox = Outbox(
+                self.config,
+                self.data_dir / "outbox",
+                on_delivered=self._on_email_delivered,
+                on_failed=self._on_email_failed,
+            )
+            self.outbox.start()
+        with profile.stage("renderer"):
+            from .report_render import ReportRenderer
+
+            self.renderer = ReportRenderer()
+        if self.config.screenshot_enabled:
+            with profile.stage("screenshots"):
+                self._start_screenshots()
+        with profile.stage("metrics"):
+            self._start_metrics()
+        with profile.stage("api"):
+            self._start_api()
+        with profile.stage("scheduler"):
+            self._setup_schedule()
+            self.scheduler.start()
+        with profile.stage("tray"):
+            from .tray import start_tray
+
+            self.icon = start_tray(
+                self.send_daily_report,
+                self.stop,
+                self.data_dir,
+                self.config.language,
+                on_profile=self.start_profile,
+            )
+        self.services_ready.set()
+
+    def _rebuild_tray(self) -> None:
+        from .tray import rebuild_tray_menu
+
+        rebuild_tray_menu(
+            self.icon,
+            self.send_daily_report,
+            self.stop,
+            self.data_dir,
+            self.config.language,
+            on_profile=self.start_profile,
+        )
+
+    def _start_screenshots(self) -> None:
+        from .screenshot_store import ScreenshotStore
+        from .screenshots import ScreenshotPipeline
+
+        self.screenshot_store = ScreenshotStore(
+            self.screenshot_dir,
+            quota_bytes=self.config.screenshot_quota_mb * 1024 * 1024,
+            retention_days=self.config.screenshot_retention_days,
+            compact_after_days=self.config.screenshot_compact_after_days,
+        )
+        self.screenshots = ScreenshotPipeline(
+            self.screenshot_dir,
+            fmt=self.config.screenshot_format,
+            quality=self.config.screenshot_quality,
+            max_width=self.config.screenshot_max_width,
+            on_saved=self._on_screenshot_saved,
+            dedup_distance=self.config.screenshot_dedup_distance,
+            idle_check=self.tracker.is_idle,
+        )
+
     def stop(self) -> None:
         self.running = False
         self.scheduler.stop()
+        if self.screenshots:
+            self.screenshots.shutdown(wait=False)
+        self.notifier.stop()
+        if self.outbox:
+            self.outbox.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if self.api_server:
+            self.api_server.stop()
         self.tracker.stop()
+        self.store.close()
+        if self.household:
+            self.household.close()
 
     def _setup_schedule(self) -> None:
-        self.scheduler.every_day_at(self.config.report_time, self.send_daily_report)
-        if self.config.screenshot_enabled:
-            self.scheduler.every_hour(self._screenshot_job)
-        self.scheduler.every_minutes(5, self._soft_limit_job)
-        self.scheduler.every_minutes(5, self._break_reminder_job)
-        self.scheduler.every_day_at("00:05", self._reset_daily_flags)
+        for name in ("report", "digest", "screenshot", "screenshot_maintenance", "household", "metrics_dump"):
+            self._schedule_job(name)
+        self.scheduler.every_minutes(1, self._profile_request_job)
+        self.scheduler.every_seconds(CONFIG_POLL_SECONDS, self._config_watch_job)
+
+    def _schedule_job(self, name: str) -> None:
+        """(Re)schedule one config-dependent job from the current config, or drop it if disabled."""
+        old = self._jobs.pop(name, None)
+        if old is not None:
+            self.scheduler.cancel(old)
+        config = self.config
+        job = None
+        if name == "report":
+            job = self.scheduler.every_day_at(config.report_time, self._daily_report_job)
+        elif name == "digest" and config.digest_enabled:
+            job = self.scheduler.every_day_at(config.report_time, self._digest_job)
+        elif name == "screenshot" and config.screenshot_enabled:
+            job = self.scheduler.every_hour(self._screenshot_job)
+        elif name == "screenshot_maintenance" and config.screenshot_enabled:
+            job = self.scheduler.every_minutes(5, self._screenshot_maintenance_job)
+        elif name == "household" and self.household:
+            job = self.scheduler.every_minutes(config.household_upload_minutes, self._household_job)
+        elif name == "metrics_dump" and config.metrics_dump_minutes > 0:
+            job = self.scheduler.every_minutes(config.metrics_dump_minutes, self._metrics_dump_job)
+        if job is not None:
+            self._jobs[name] = job
+
+    def _config_watch_job(self) -> None:
+        if _stat_key(Path(self.config.rules_file)) != self._rules_stat:
+            self._load_rules()
+        config = self.config_watcher.check()
+        if config is not None:
+            self.apply_config(config)
+        elif self.config_watcher.last_error:
+            logger.warning("Ignoring invalid config change: %s", self.config_watcher.last_error)
+            self.config_watcher.last_error = None
+
+    def apply_config(self, new: AppConfig) -> Set[str]:
+        """Apply only what changed between the running config and ``new``; returns the changed fields."""
+        changed = changed_fields(self.config, new)
+        if not changed:
+            return changed
+        self.config = new
+        if self.outbox:
+            # SMTP settings and the recipient are read at send time.
+            self.outbox.config = new
+        tracker = self.tracker
+        if "idle_minutes" in changed:
+            tracker.set_idle_minutes(new.idle_minutes)
+        if "input_coalesce_ms" in changed:
+            tracker.set_input_window(new.input_coalesce_ms / 1000)
+        if "report_top_apps" in changed:
+            tracker.top_apps = new.report_top_apps
+        if "app_key_limit" in changed:
+            # Today's summary keeps its capacity; the next day starts with the new one.
+            tracker.app_capacity = new.app_key_limit
+        if changed & RULE_FIELDS:
+            self._load_rules()
+        if new.screenshot_enabled and self.screenshots is None and self.services_ready.is_set():
+            self._start_screenshots()
+        elif self.screenshots is not None:
+            self.screenshots.fmt = new.screenshot_format
+            self.screenshots.quality = new.screenshot_quality
+            self.screenshots.max_width = new.screenshot_max_width
+            self.screenshots.dedup_distance = new.screenshot_dedup_distance
+            self.screenshot_store.quota_bytes = new.screenshot_quota_mb * 1024 * 1024
+            self.screenshot_store.retention_days = new.screenshot_retention_days
+            self.screenshot_store.compact_after_days = new.screenshot_compact_after_days
+        if self.household:
+            self.household.child = new.household_child or new.household_machine
+            self.household.machine = new.household_machine
+        if "metrics_port" in changed:
+            if self.metrics_server:
+                self.metrics_server.stop()
+                self.metrics_server = None
+            self._start_metrics()
+        if "api_port" in changed:
+            if self.api_server:
+                self.api_server.stop()
+                self.api_server = None
+            self._start_api()
+        if "language" in changed:
+            self._rebuild_tray()
+        if self.services_ready.is_set():
+            for name in sorted({name for field in changed for name in RESCHEDULE.get(field, ())}):
+                self._schedule_job(name)
+        restart = changed & RESTART_REQUIRED
+        if restart:
+            logger.warning("Config change needs a restart to take effect: %s", ", ".join(sorted(restart)))
+        logger.info("Applied config change: %s", ", ".join(sorted(changed)))
+        return changed
+
+    def _start_metrics(self) -> None:
+        if not self.config.metrics_port:
+            return
+        try:
+            self.metrics_server = MetricsServer(self.config.metrics_port)
+            self.metrics_server.start()
+        except OSError:
+            # Port busy: keep running without the endpoint.
+            self.metrics_server = None
+
+    def _start_api(self) -> None:
+        if not self.config.api_port:
+            return
+        from .api import QueryServer
+
+        try:
+            self.api_server = QueryServer(self.tracker, self.config.api_port)
+            self.api_server.start()
+        except OSError:
+            self.api_server = None
+
+    def start_profile(self) -> None:
+        self.profiler.start()
+
+    def _install_profile_signal(self) -> None:
+        # POSIX only; on Windows use the tray item or the data_dir/profile.request file.
+        if hasattr(signal, "SIGUSR1"):
+            try:
+                signal.signal(signal.SIGUSR1, lambda signum, frame: self.start_profile())
+            except ValueError:
+                # Not on the main thread.
+                pass
+
+    def _profile_request_job(self) -> None:
+        self.profiler.check_control_file(self.data_dir)
+
+    def _on_profile_finished(self, path: Path) -> None:
+        self.notifier.notify(
+            t("notify_profile_title", self.config.language),
+            t("notify_profile_body", self.config.language, filename=path.name),
+            key="profile",
+        )
+
+    def _metrics_dump_job(self) -> None:
+        try:
+            registry.dump_json(self.data_dir / "metrics.json")
+        except OSError:
+            pass
 
     def _screenshot_job(self) -> None:
         try:
-            path = take_screenshot(self.screenshot_dir)
-            self.notifier.notify(
-                t("notify_screenshot_title", self.config.language),
-                t("notify_screenshot_body", self.config.language, filename=path.name),
-            )
+            self.screenshots.capture()
         except Exception:
             pass
 
-    def _soft_limit_job(self) -> None:
-        snap = self.tracker.snapshot()
-        minutes = snap.active_seconds / 60
-        if not self._warning_notified and minutes >= self.config.warning_minutes:
-            self.notifier.notify(
-                t("notify_warning_title", self.config.language),
-                t("notify_warning_body", self.config.language),
-            )
-            self._warning_notified = True
-        if not self._soft_limit_notified and minutes >= self.config.soft_limit_minutes:
-            self.notifier.notify(
-                t("notify_soft_limit_title", self.config.language),
-                t("notify_soft_limit_body", self.config.language),
-            )
-            self._soft_limit_notified = True
-        if not self._hard_limit_notified and minutes >= self.config.hard_limit_minutes:
-            self.notifier.notify(
-                t("notify_hard_limit_title", self.config.language),
-                t("notify_hard_limit_body", self.config.language),
-            )
-            self._hard_limit_notified = True
+    def _screenshot_maintenance_job(self) -> None:
+        try:
+            self.screenshot_store.evict()
+            self.screenshot_store.compact_step(budget_seconds=0.5)
+        except Exception:
+            pass
 
-    def _break_reminder_job(self) -> None:
+    def _on_screenshot_saved(self, path: Path) -> None:
+        self.screenshot_store.add(path)
+        self.notifier.notify(
+            t("notify_screenshot_title", self.config.language),
+            t("notify_screenshot_body", self.config.language, filename=path.name),
+            key="screenshot",
+        )
+
+    def _household_job(self) -> None:
+        if self.household.upload():
+            # Limits apply to the child's total across all machines.
+            day = self.tracker.snapshot().day.isoformat()
+            self.rules.observe_total(day, self.household.active_seconds(day), time.time())
+
+    def _builtin_rules(self) -> List[Rule]:
+        config = self.config
+        rules: List[Rule] = [
+            BudgetRule("warning", config.warning_minutes * 60, key="warning"),
+            BudgetRule("soft_limit", config.soft_limit_minutes * 60, key="soft_limit"),
+            BudgetRule("hard_limit", config.hard_limit_minutes * 60, key="hard_limit"),
+        ]
+        if config.break_interval_minutes > 0:
+            interval = config.break_interval_minutes * 60
+            rules.append(BudgetRule("break", interval, repeat=interval, key="break"))
+        return rules
+
+    def _load_rules(self) -> None:
+        """(Re)build the rule set and seed it from today's totals."""
+        rules = self._builtin_rules()
+        path = Path(self.config.rules_file)
+        self._rules_stat = _stat_key(path)
+        try:
+            rules += load_rules(path)
+        except ValueError as exc:
+            logger.warning("Ignoring rules file: %s", exc)
+        self.rules.set_rules(rules)
         snap = self.tracker.snapshot()
-        if self.config.break_interval_minutes <= 0:
+        self.rules.seed(snap.day.isoformat(), snap.active_seconds, snap.per_exe_seconds or {}, time.time())
+        if self.household:
+            day = snap.day.isoformat()
+            self.rules.observe_total(day, self.household.active_seconds(day), time.time())
+
+    def _on_rule_fired(self, rule: Rule, at: float) -> None:
+        language = self.config.language
+        if rule.key in BUILTIN_RULE_TEXT:
+            title_key, body_key = BUILTIN_RULE_TEXT[rule.key]
+            self.notifier.notify(t(title_key, language), t(body_key, language), key=rule.key)
             return
-        bucket = int(snap.active_seconds // (self.config.break_interval_minutes * 60))
-        if bucket > self._break_notice_bucket:
-            self._break_notice_bucket = bucket
-            self.notifier.notify(
-                t("notify_break_title", self.config.language),
-                t("notify_break_body", self.config.language),
+        if rule.kind == WINDOW:
+            body = t(
+                "notify_rule_window_body",
+                language,
+                start=f"{rule.start // 60:02d}:{rule.start % 60:02d}",
+                end=f"{rule.end // 60:02d}:{rule.end % 60:02d}",
             )
+        else:
+            body_key = "notify_rule_session_body" if rule.kind == SESSION else "notify_rule_budget_body"
+            body = t(body_key, language, minutes=int(rule.limit // 60))
+        self.notifier.notify(t("notify_rule_title", language, name=rule.name), body, key=rule.key)
 
-    def _reset_daily_flags(self) -> None:
-        self._soft_limit_notified = False
-        self._hard_limit_notified = False
-        self._warning_notified = False
-        self._break_notice_bucket = 0
+    def _digest_job(self) -> None:
+        today = date.today()
+        if today.weekday() == 0:
+            self.send_digest("week")
+        if today.day == 1:
+            self.send_digest("month")
 
-    def send_daily_report(self) -> None:
-        snap = self.tracker.snapshot()
-        body = format_report_localized(snap, self.config.language)
+    def send_digest(self, period: str) -> None:
+        """Email last week's or last month's totals, served from the history index."""
+        self.history.refresh()
+        today = date.today()
+        snap = self.history.last_month(today) if period == "month" else self.history.last_week(today)
+        subject = t(
+            "email_digest_subject",
+            self.config.language,
+            start=snap.day.isoformat(),
+            end=snap.end_day.isoformat(),
+        )
+        self._send_report(subject, snap)
+
+    def _daily_report_job(self) -> None:
+        # After a sleep past midnight the catch-up run reports the day whose deadline was missed.
+        job = self._jobs.get("report")
+        self.send_daily_report(date.fromtimestamp(job.last_due) if job and job.last_due else None)
+
+    def send_daily_report(self, day: Optional[date] = None) -> None:
+        snap = self.tracker.snapshot() if day is None else self.tracker.day_snapshot(day)
         subject = t("email_subject", self.config.language, date=snap.day.isoformat())
-        try:
-            send_email(self.config, subject, body)
-            self.notifier.notify(
-                t("notify_report_sent_title", self.config.language),
-                t("notify_report_sent_body", self.config.language),
-            )
-        except Exception:
+        self._send_report(subject, snap)
+
+    def _send_report(self, subject: str, snap) -> None:
+        from .emailer import build_message
+
+        report = self.renderer.render(snap, self.config.language)
+        self.outbox.enqueue(
+            build_message(self.config, subject, report.text, html=report.html, images=report.images)
+        )
+
+    def _on_email_delivered(self, message_id: str) -> None:
+        self.notifier.notify(
+            t("notify_report_sent_title", self.config.language),
+            t("notify_report_sent_body", self.config.language),
+            key="report_sent",
+        )
+
+    def _on_email_failed(self, message_id: str, attempts: int, permanent: bool) -> None:
+        # Tell the user once per message; later retries happen silently.
+        if attempts == 1 or permanent:
             self.notifier.notify(
                 t("notify_report_failed_title", self.config.language),
                 t("notify_report_failed_body", self.config.language),
+                key="report_failed",
             )
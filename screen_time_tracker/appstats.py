@@ -0,0 +1,135 @@
+import heapq
+import sys
+from collections import defaultdict
+from typing import Dict, Optional
+
+OTHER_KEY = "other"
+
+
+def exe_of(key: str) -> str:
+    """Executable part of a ``"{exe} - {title}"`` app key."""
+    return key.split(" - ", 1)[0]
+
+
+def per_exe_totals(data: Dict) -> Dict[str, float]:
+    """Per-executable seconds of a persisted day.
+
+    Day files written before executables were tracked separately only have
+    app keys, so the totals are rebuilt from those.
+    """
+    per_exe = data.get("per_exe")
+    if per_exe:
+        return per_exe
+    totals: Dict[str, float] = defaultdict(float)
+    for key, seconds in data.get("per_app", {}).items():
+        totals[exe_of(key)] += seconds
+    return dict(totals)
+
+
+class AppUsage:
+    """Per-app seconds with exact executable totals and a bounded title summary.
+
+    Per-executable totals are exact (there are only a handful of executables).
+    Window-title keys go through a Space-Saving summary of ``capacity``
+    counters: when a new key arrives and the summary is full it takes over the
+    smallest counter and records that counter's value as its error. Any
+    tracked key's true total lies in ``[count - error, count]`` and any
+    untracked key has at most :meth:`error_bound` seconds.
+    """
+
+    def __init__(self, capacity: int = 500) -> None:
+        self.capacity = max(capacity, 1)
+        self.total = 0.0
+        self.per_exe: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, float] = {}
+        self.errors: Dict[str, float] = {}
+        # Cached result of top(_top_n), kept current by add() while membership is unchanged.
+        self._top: Optional[Dict[str, float]] = None
+        self._top_n: Optional[int] = None
+        self._top_floor = 0.0
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def add(self, key: str, seconds: float) -> None:
+        self.total += seconds
+        self.per_exe[exe_of(key)] += seconds
+        counts = self.counts
+        top = self._top
+        if key in counts:
+            counts[key] += seconds
+            if top is not None:
+                if key in top and key != OTHER_KEY:
+                    top[key] += seconds
+                else:
+                    self._add_to_tail(key, seconds)
+            return
+        key = sys.intern(key)
+        if len(counts) < self.capacity:
+            counts[key] = seconds
+            self.errors[key] = 0.0
+            if top is not None:
+                self._add_to_tail(key, seconds)
+            return
+        victim = min(counts, key=counts.__getitem__)
+        floor = counts.pop(victim)
+        self.errors.pop(victim, None)
+        counts[key] = floor + seconds
+        self.errors[key] = floor
+        if top is not None:
+            if victim in top:
+                self._top = None
+            else:
+                # The victim's seconds move to the new key; the tail grows by ``seconds``.
+                self._add_to_tail(key, seconds)
+
+    def _add_to_tail(self, key: str, seconds: float) -> None:
+        """Account ``seconds`` of a key outside the cached top, or drop the cache if it may enter."""
+        top = self._top
+        if OTHER_KEY in top and key not in top and self.counts[key] <= self._top_floor:
+            top[OTHER_KEY] += seconds
+        else:
+            self._top = None
+
+    def error_bound(self) -> float:
+        """Upper bound on the seconds of any key not currently tracked."""
+        if len(self.counts) < self.capacity:
+            return 0.0
+        return min(self.counts.values())
+
+    def top(self, top_n: Optional[int] = None) -> Dict[str, float]:
+        """Top ``top_n`` keys by seconds, with the remainder folded into ``"other"``."""
+        counts = self.counts
+        if top_n is None or len(counts) <= top_n:
+            return dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
+        if self._top is not None and self._top_n == top_n:
+            # The tracker publishes this on every tick; usually only one value moved.
+            return dict(self._top)
+        keys = heapq.nlargest(top_n, counts, key=counts.__getitem__)
+        result = {key: counts[key] for key in keys}
+        self._top_floor = min(result.values())
+        tail = sum(counts.values()) - sum(result.values())
+        result[OTHER_KEY] = result.get(OTHER_KEY, 0.0) + tail
+        self._top = dict(result)
+        self._top_n = top_n
+        return result
+
+    def to_dict(self) -> Dict:
+        return {
+            "per_app": dict(self.counts),
+            "per_app_errors": {key: err for key, err in self.errors.items() if err},
+            "per_exe": dict(self.per_exe),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, capacity: int = 500) -> "AppUsage":
+        usage = cls(capacity)
+        for key, seconds in data.get("per_app", {}).items():
+            usage.add(key, float(seconds))
+        errors = data.get("per_app_errors", {})
+        for key, err in errors.items():
+            if key in usage.counts:
+                usage.errors[key] = max(usage.errors[key], float(err))
+        if data.get("per_exe"):
+            usage.per_exe = defaultdict(float, {key: float(val) for key, val in data["per_exe"].items()})
+        return usage
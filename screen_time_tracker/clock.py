@@ -0,0 +1,34 @@
+import time
+
+
+class SystemClock:
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+
+class FakeClock:
+    """Manually advanced clock for tests and benchmarks.
+
+    ``advance`` moves both clocks; ``jump`` moves only the wall clock, like a
+    clock change or (on platforms whose monotonic clock stops) a sleep.
+    """
+
+    def __init__(self, start: float, monotonic: float = 1000.0) -> None:
+        self.wall = start
+        self.mono = monotonic
+
+    def time(self) -> float:
+        return self.wall
+
+    def monotonic(self) -> float:
+        return self.mono
+
+    def advance(self, seconds: float) -> None:
+        self.wall += seconds
+        self.mono += seconds
+
+    def jump(self, seconds: float) -> None:
+        self.wall += seconds
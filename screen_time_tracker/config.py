@@ -1,7 +1,13 @@
+import hashlib
 import os
-from dataclasses import dataclass
+import platform
+import re
+from dataclasses import dataclass, fields
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Set
+
+# Keys of screenshots.FORMATS; listed here so validating a config does not load Pillow.
+SCREENSHOT_FORMATS = ("png", "jpeg", "jpg", "webp")
 
 
 @dataclass
@@ -27,25 +33,66 @@ class AppConfig:
     data_dir: str
     language: str
     smtp: SMTPConfig
+    input_coalesce_ms: int = 500
+    app_key_limit: int = 500
+    report_top_apps: int = 50
+    digest_enabled: bool = True
+    screenshot_format: str = "png"
+    screenshot_quality: int = 80
+    screenshot_max_width: int = 0
+    screenshot_dedup_distance: int = 4
+    screenshot_quota_mb: int = 2048
+    screenshot_retention_days: int = 90
+    screenshot_compact_after_days: int = 7
+    metrics_port: int = 0
+    metrics_dump_minutes: int = 15
+    api_port: int = 0
+    rules_file: str = ""
+    idle_source: str = "auto"
+    storage: str = "json"
+    household_url: str = ""
+    household_child: str = ""
+    household_machine: str = ""
+    household_upload_minutes: int = 1
+
+
+# Keys that came from the env file rather than the real environment; only these
+# may be overwritten or removed when the file is reloaded.
+_FILE_KEYS: Set[str] = set()
+
+
+def read_env_file(path: Path) -> Dict[str, str]:
+    values: Dict[str, str] = {}
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, val = line.split("=", 1)
+        values[key.strip()] = val.strip().strip('"').strip("'")
+    return values
 
 
-def load_env_file(path: Path | None = None) -> None:
-    """Populate os.environ from a simple KEY=VALUE env file if present."""
+def load_env_file(path: Path | None = None, reload: bool = False) -> None:
+    """Populate os.environ from a simple KEY=VALUE env file if present.
+
+    Variables set in the real environment always win. With ``reload`` the
+    values this file set earlier are replaced (or removed) by its current content.
+    """
     env_path = path or Path(__file__).resolve().parent.parent / "env"
     if not env_path.exists():
         return
     try:
-        for line in env_path.read_text(encoding="utf-8").splitlines():
-            line = line.strip()
-            if not line or line.startswith("#") or "=" not in line:
-                continue
-            key, val = line.split("=", 1)
-            key = key.strip()
-            val = val.strip().strip('"').strip("'")
-            os.environ.setdefault(key, val)
+        values = read_env_file(env_path)
     except Exception:
         # Best effort: do not break app if env file malformed.
-        pass
+        return
+    if reload:
+        for key in _FILE_KEYS - values.keys():
+            os.environ.pop(key, None)
+    for key, val in values.items():
+        if key not in os.environ or (reload and key in _FILE_KEYS):
+            os.environ[key] = val
+            _FILE_KEYS.add(key)
 
 
 def _env(key: str) -> Optional[str]:
@@ -83,9 +130,9 @@ def _require(value, name: str):
     return value
 
 
-def load_config(path: Path) -> AppConfig:
+def load_config(path: Path, reload: bool = False) -> AppConfig:
     # Load env file before reading environment variables.
-    load_env_file(path)
+    load_env_file(path, reload=reload)
 
     idle_minutes = _to_int(_pick("TRACKER_IDLE_MINUTES", None))
     report_time = _pick("TRACKER_REPORT_TIME", None)
@@ -98,6 +145,27 @@ def load_config(path: Path) -> AppConfig:
     screenshot_dir = _pick("TRACKER_SCREENSHOT_DIR", None)
     data_dir = _pick("TRACKER_DATA_DIR", None)
     language = _pick("TRACKER_LANGUAGE", None)
+    input_coalesce_ms = _to_int(_pick("TRACKER_INPUT_COALESCE_MS", None))
+    app_key_limit = _to_int(_pick("TRACKER_APP_KEY_LIMIT", None))
+    report_top_apps = _to_int(_pick("TRACKER_REPORT_TOP_APPS", None))
+    digest_enabled = _to_bool(_pick("TRACKER_DIGEST_ENABLED", None))
+    screenshot_format = _pick("TRACKER_SCREENSHOT_FORMAT", None)
+    screenshot_quality = _to_int(_pick("TRACKER_SCREENSHOT_QUALITY", None))
+    screenshot_max_width = _to_int(_pick("TRACKER_SCREENSHOT_MAX_WIDTH", None))
+    screenshot_dedup_distance = _to_int(_pick("TRACKER_SCREENSHOT_DEDUP_DISTANCE", None))
+    screenshot_quota_mb = _to_int(_pick("TRACKER_SCREENSHOT_QUOTA_MB", None))
+    screenshot_retention_days = _to_int(_pick("TRACKER_SCREENSHOT_RETENTION_DAYS", None))
+    screenshot_compact_after_days = _to_int(_pick("TRACKER_SCREENSHOT_COMPACT_AFTER_DAYS", None))
+    metrics_port = _to_int(_pick("TRACKER_METRICS_PORT", None))
+    metrics_dump_minutes = _to_int(_pick("TRACKER_METRICS_DUMP_MINUTES", None))
+    api_port = _to_int(_pick("TRACKER_API_PORT", None))
+    rules_file = _pick("TRACKER_RULES_FILE", None)
+    idle_source = _pick("TRACKER_IDLE_SOURCE", None)
+    storage = _pick("TRACKER_STORAGE", None)
+    household_url = _pick("TRACKER_HOUSEHOLD_URL", None)
+    household_child = _pick("TRACKER_HOUSEHOLD_CHILD", None)
+    household_machine = _pick("TRACKER_HOUSEHOLD_MACHINE", None)
+    household_upload_minutes = _to_int(_pick("TRACKER_HOUSEHOLD_UPLOAD_MINUTES", None))
 
     smtp_host = _pick("TRACKER_SMTP_HOST", None)
     smtp_port = _to_int(_pick("TRACKER_SMTP_PORT", None))
@@ -126,6 +194,29 @@ def load_config(path: Path) -> AppConfig:
             password=str(_require(smtp_password, "TRACKER_SMTP_PASSWORD")),
             use_ssl=bool(smtp_use_ssl if smtp_use_ssl is not None else True),
         ),
+        input_coalesce_ms=input_coalesce_ms if input_coalesce_ms is not None else 500,
+        app_key_limit=app_key_limit or 500,
+        report_top_apps=report_top_apps or 50,
+        digest_enabled=digest_enabled if digest_enabled is not None else True,
+        screenshot_format=str(screenshot_format or "png").lower(),
+        screenshot_quality=screenshot_quality or 80,
+        screenshot_max_width=screenshot_max_width or 0,
+        screenshot_dedup_distance=screenshot_dedup_distance if screenshot_dedup_distance is not None else 4,
+        screenshot_quota_mb=screenshot_quota_mb if screenshot_quota_mb is not None else 2048,
+        screenshot_retention_days=screenshot_retention_days if screenshot_retention_days is not None else 90,
+        screenshot_compact_after_days=(
+            screenshot_compact_after_days if screenshot_compact_after_days is not None else 7
+        ),
+        metrics_port=metrics_port or 0,
+        metrics_dump_minutes=metrics_dump_minutes if metrics_dump_minutes is not None else 15,
+        api_port=api_port or 0,
+        rules_file=str(rules_file or Path(str(data_dir or ".")) / "rules.json"),
+        idle_source=str(idle_source or "auto").lower(),
+        storage=str(storage or "json").lower(),
+        household_url=str(household_url or ""),
+        household_child=str(household_child or ""),
+        household_machine=str(household_machine or platform.node()),
+        household_upload_minutes=household_upload_minutes or 1,
     )
 
 
@@ -134,3 +225,72 @@ def config_path() -> Path:
     if env:
         return Path(env)
     return Path(__file__).resolve().parent.parent / "env"
+
+
+def validate_config(config: AppConfig) -> None:
+    """Reject values that parse but cannot work; raises ``ValueError``."""
+    from .storage import BACKENDS
+
+    if not re.fullmatch(r"([01]?\d|2[0-3]):[0-5]\d", config.report_time):
+        raise ValueError(f"Invalid TRACKER_REPORT_TIME: {config.report_time}")
+    if config.idle_minutes <= 0:
+        raise ValueError("TRACKER_IDLE_MINUTES must be positive")
+    if config.screenshot_format not in SCREENSHOT_FORMATS:
+        raise ValueError(f"Unsupported TRACKER_SCREENSHOT_FORMAT: {config.screenshot_format}")
+    if config.household_upload_minutes <= 0:
+        raise ValueError("TRACKER_HOUSEHOLD_UPLOAD_MINUTES must be positive")
+    if config.storage not in BACKENDS:
+        raise ValueError(f"Unsupported TRACKER_STORAGE: {config.storage}")
+
+
+def changed_fields(old: AppConfig, new: AppConfig) -> Set[str]:
+    return {field.name for field in fields(AppConfig) if getattr(old, field.name) != getattr(new, field.name)}
+
+
+class ConfigWatcher:
+    """Polls the env file and returns a validated new config when its content changes.
+
+    A cheap ``stat`` runs on every :meth:`check`; the file is read and hashed
+    only when its mtime or size moved, and parsed only when the hash differs,
+    so touching the file or saving it unchanged does nothing.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._stat = self._stat_key()
+        self._digest = self._hash()
+
+    def _stat_key(self):
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _hash(self) -> Optional[str]:
+        try:
+            return hashlib.sha1(self.path.read_bytes()).hexdigest()
+        except OSError:
+            return None
+
+    def check(self) -> Optional[AppConfig]:
+        stat = self._stat_key()
+        if stat == self._stat:
+            return None
+        self._stat = stat
+        digest = self._hash()
+        if digest is None or digest == self._digest:
+            return None
+        self._digest = digest
+        try:
+            config = load_config(self.path, reload=True)
+            validate_config(config)
+        except ValueError as exc:
+            # Keep running on the old config; the next edit gets another try.
+            self.errors += 1
+            self.last_error = str(exc)
+            return None
+        self.last_error = None
+        return config
@@ -1,26 +1,50 @@
 import smtplib
 import ssl
+from contextlib import contextmanager
 from email.message import EmailMessage
-from typing import Optional
+from typing import Dict, Iterator, Optional
 
 from .config import AppConfig
 
 
-def send_email(config: AppConfig, subject: str, body: str, to: Optional[str] = None) -> None:
+def build_message(
+    config: AppConfig,
+    subject: str,
+    body: str,
+    to: Optional[str] = None,
+    html: Optional[str] = None,
+    images: Optional[Dict[str, bytes]] = None,
+) -> EmailMessage:
+    """Plain-text message, or multipart/alternative with inline PNGs when ``html`` is given."""
     recipient = to or config.parent_email
     msg = EmailMessage()
     msg["From"] = config.smtp.user
     msg["To"] = recipient
     msg["Subject"] = subject
     msg.set_content(body)
+    if html:
+        msg.add_alternative(html, subtype="html")
+        html_part = msg.get_payload()[-1]
+        for cid, data in (images or {}).items():
+            html_part.add_related(data, "image", "png", cid=f"<{cid}>")
+    return msg
+
 
+@contextmanager
+def open_smtp(config: AppConfig) -> Iterator[smtplib.SMTP]:
+    """Connected and authenticated SMTP session; reuse it for a batch of messages."""
     if config.smtp.use_ssl:
         context = ssl.create_default_context()
         with smtplib.SMTP_SSL(config.smtp.host, config.smtp.port, context=context) as server:
             server.login(config.smtp.user, config.smtp.password)
-            server.send_message(msg)
+            yield server
     else:
         with smtplib.SMTP(config.smtp.host, config.smtp.port) as server:
             server.starttls(context=ssl.create_default_context())
             server.login(config.smtp.user, config.smtp.password)
-            server.send_message(msg)
+            yield server
+
+
+def send_email(config: AppConfig, subject: str, body: str, to: Optional[str] = None) -> None:
+    with open_smtp(config) as server:
+        server.send_message(build_message(config, subject, body, to))
@@ -0,0 +1,194 @@
+"""Streaming export of the stored history to CSV, JSONL or Parquet.
+
+Stored days are read one at a time and turned into rows by generators, so
+memory stays at one day plus (for Parquet) one row group however long
+the range is. Three levels of detail:
+
+``exes``
+    ``day, exe, seconds`` — exact per-executable totals (default);
+``apps``
+    ``day, exe, app, seconds, error`` — per window title, kept with bounded
+    memory, so ``seconds`` may overcount by up to ``error``;
+``intervals``
+    ``day, start, end, exe`` — the activity timeline (epoch seconds).
+
+Parquet needs ``pyarrow``; zstd compression of CSV/JSONL needs ``zstandard``.
+"""
+
+import csv
+import gzip
+import io
+import json
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from .appstats import exe_of, per_exe_totals
+from .storage import AUTO, DayStore, open_store
+
+EXES = "exes"
+APPS = "apps"
+INTERVALS = "intervals"
+COLUMNS = {
+    EXES: ("day", "exe", "seconds"),
+    APPS: ("day", "exe", "app", "seconds", "error"),
+    INTERVALS: ("day", "start", "end", "exe"),
+}
+FORMATS = ("csv", "jsonl", "parquet")
+COMPRESSIONS = ("none", "gzip", "zstd")
+PARQUET_BATCH_ROWS = 65_536
+
+_SUFFIX_COMPRESSION = {".gz": "gzip", ".zst": "zstd"}
+
+
+def exe_rows(days: Iterable[Tuple[str, Dict]], apps: Optional[set] = None) -> Iterator[tuple]:
+    for day, data in days:
+        for exe, seconds in per_exe_totals(data).items():
+            if apps is None or exe.lower() in apps:
+                yield day, exe, round(seconds, 1)
+
+
+def app_rows(days: Iterable[Tuple[str, Dict]], apps: Optional[set] = None) -> Iterator[tuple]:
+    for day, data in days:
+        errors = data.get("per_app_errors", {})
+        for key, seconds in data.get("per_app", {}).items():
+            exe = exe_of(key)
+            if apps is None or exe.lower() in apps:
+                yield day, exe, key, round(seconds, 1), round(errors.get(key, 0.0), 1)
+
+
+def interval_rows(days: Iterable[Tuple[str, Dict]], apps: Optional[set] = None) -> Iterator[tuple]:
+    for day, data in days:
+        timeline = data.get("timeline") or {}
+        names = timeline.get("apps", [])
+        for start, end, idx in zip(timeline.get("start", []), timeline.get("end", []), timeline.get("app", [])):
+            exe = names[idx]
+            if apps is None or exe.lower() in apps:
+                yield day, round(start, 1), round(end, 1), exe
+
+
+ROWS = {EXES: exe_rows, APPS: app_rows, INTERVALS: interval_rows}
+
+
+def guess_format(path: str) -> Tuple[str, str]:
+    """``(format, compression)`` from a name like ``usage.csv.gz``."""
+    name = path.lower()
+    compression = "none"
+    for suffix, codec in _SUFFIX_COMPRESSION.items():
+        if name.endswith(suffix):
+            compression = codec
+            name = name[: -len(suffix)]
+    fmt = name.rsplit(".", 1)[-1] if "." in name else "csv"
+    if fmt == "json":
+        fmt = "jsonl"
+    return (fmt if fmt in FORMATS else "csv"), compression
+
+
+def _open_binary(path: str, compression: str):
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd compression needs the zstandard package") from None
+    raw = sys.stdout.buffer if path == "-" else open(path, "wb")
+    if compression == "gzip":
+        # zlib's default level; 9 is several times slower for a few percent smaller output.
+        return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6), raw
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=False), raw
+    return raw, raw
+
+
+def _write_text(rows: Iterable[tuple], columns: Tuple[str, ...], path: str, fmt: str, compression: str) -> int:
+    stream, raw = _open_binary(path, compression)
+    count = 0
+    try:
+        text = io.TextIOWrapper(stream, encoding="utf-8", newline="", write_through=False)
+        if fmt == "csv":
+            writer = csv.writer(text)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+            for row in rows:
+                text.write(dumps(dict(zip(columns, row))))
+                text.write("\n")
+                count += 1
+        text.flush()
+        text.detach()
+    finally:
+        if stream is not raw:
+            stream.close()
+        if raw is sys.stdout.buffer:
+            raw.flush()
+        else:
+            raw.close()
+    return count
+
+
+def _write_parquet(rows: Iterable[tuple], columns: Tuple[str, ...], path: str, compression: str) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs the pyarrow package") from None
+    types = {"day": pa.string(), "exe": pa.string(), "app": pa.string()}
+    schema = pa.schema([(name, types.get(name, pa.float64())) for name in columns])
+    count = 0
+    with pq.ParquetWriter(path, schema, compression=compression) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= PARQUET_BATCH_ROWS:
+                writer.write_table(pa.Table.from_arrays([pa.array(col) for col in zip(*batch)], schema=schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_arrays([pa.array(col) for col in zip(*batch)], schema=schema))
+            count += len(batch)
+    return count
+
+
+def export(
+    data_dir: Path,
+    out: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    level: str = EXES,
+    apps: Optional[Iterable[str]] = None,
+    fmt: Optional[str] = None,
+    compression: Optional[str] = None,
+    store: Optional[DayStore] = None,
+) -> int:
+    """Write history for ``start``..``end`` to ``out`` (``-`` for stdout); returns the number of rows.
+
+    ``fmt`` and ``compression`` default to what the file name says
+    (``usage.jsonl.gz``, ``usage.parquet``). ``apps`` keeps only the given
+    executables (case-insensitive). Days come from ``store``, by default
+    whichever store ``data_dir`` holds.
+    """
+    guessed_fmt, guessed_compression = guess_format(out)
+    fmt = fmt or guessed_fmt
+    compression = compression or guessed_compression
+    if level not in COLUMNS:
+        raise ValueError(f"Unknown export level: {level}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unsupported compression: {compression}")
+    if fmt == "parquet" and out == "-":
+        raise ValueError("Parquet cannot be written to stdout")
+    wanted = {app.lower() for app in apps} if apps else None
+    owned = store is None
+    store = store or open_store(data_dir, AUTO, readonly=True)
+    try:
+        rows = ROWS[level](store.iter_days(start, end), wanted)
+        if fmt == "parquet":
+            return _write_parquet(rows, COLUMNS[level], out, compression)
+        return _write_text(rows, COLUMNS[level], out, fmt, compression)
+    finally:
+        if owned:
+            store.close()
@@ -0,0 +1,201 @@
+import json
+import os
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .appstats import per_exe_totals
+from .storage import DAY_FILE_RE
+from .tracker import ActivitySnapshot
+
+INDEX_VERSION = 1
+
+
+def week_key(day: date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def month_key(day: date) -> str:
+    return f"{day.year}-{day.month:02d}"
+
+
+def week_bounds(day: date) -> Tuple[date, date]:
+    start = day - timedelta(days=day.weekday())
+    return start, start + timedelta(days=6)
+
+
+def _merge(target: Dict, source: Dict) -> None:
+    target["active"] += source["active"]
+    apps = target["apps"]
+    for app, seconds in source["apps"].items():
+        apps[app] = apps.get(app, 0.0) + seconds
+
+
+class History:
+    """Range queries over stored days; subclasses implement :meth:`query`."""
+
+    def refresh(self) -> int:
+        return 0
+
+    def query(self, start: date, end: date) -> ActivitySnapshot:
+        raise NotImplementedError
+
+    def top(self, start: date, end: date, n: int) -> List[Tuple[str, float]]:
+        """The ``n`` executables with the most time over ``start``..``end``."""
+        apps = self.query(start, end).per_app_seconds
+        return sorted(apps.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def last_week(self, today: date) -> ActivitySnapshot:
+        start, end = week_bounds(today - timedelta(days=7))
+        return self.query(start, end)
+
+    def last_month(self, today: date) -> ActivitySnapshot:
+        end = today.replace(day=1) - timedelta(days=1)
+        return self.query(end.replace(day=1), end)
+
+
+class HistoryIndex(History):
+    """Incrementally maintained daily/weekly/monthly rollups of the per-day files.
+
+    The index lives in ``history_index.json`` next to the day files. On
+    :meth:`refresh` only day files whose mtime or size changed are re-read,
+    and only the weeks/months they belong to are re-aggregated. Apps are
+    aggregated per executable, which is exact and stays small over years.
+    """
+
+    def __init__(self, data_dir: Path, index_name: str = "history_index.json") -> None:
+        self.data_dir = data_dir
+        self.index_path = data_dir / index_name
+        self.days: Dict[str, Dict] = {}
+        self.weeks: Dict[str, Dict] = {}
+        self.months: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("version") != INDEX_VERSION:
+            return
+        self.days = data.get("days", {})
+        self.weeks = data.get("weeks", {})
+        self.months = data.get("months", {})
+
+    def _save(self) -> None:
+        data = {"version": INDEX_VERSION, "days": self.days, "weeks": self.weeks, "months": self.months}
+        tmp = self.index_path.with_suffix(".json.tmp")
+        try:
+            tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, self.index_path)
+        except OSError:
+            pass
+
+    def refresh(self) -> int:
+        """Re-read new or changed day files; returns how many were (re)indexed."""
+        with self.lock:
+            seen: Set[str] = set()
+            dirty: Set[date] = set()
+            try:
+                entries = list(os.scandir(self.data_dir))
+            except OSError:
+                return 0
+            for entry in entries:
+                match = DAY_FILE_RE.match(entry.name)
+                if not match:
+                    continue
+                day = match.group(1)
+                seen.add(day)
+                stat = entry.stat()
+                known = self.days.get(day)
+                if known and known["mtime"] == stat.st_mtime_ns and known["size"] == stat.st_size:
+                    continue
+                record = self._read_day(Path(entry.path))
+                if record is None:
+                    continue
+                record["mtime"] = stat.st_mtime_ns
+                record["size"] = stat.st_size
+                self.days[day] = record
+                dirty.add(date.fromisoformat(day))
+            for day in set(self.days) - seen:
+                del self.days[day]
+                dirty.add(date.fromisoformat(day))
+            if dirty:
+                self._rebuild_rollups(dirty)
+                self._save()
+            return len(dirty)
+
+    @staticmethod
+    def _read_day(path: Path) -> Optional[Dict]:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return {"active": float(data.get("active_seconds", 0.0)), "apps": dict(per_exe_totals(data))}
+
+    def _rebuild_rollups(self, dirty: Iterable[date]) -> None:
+        weeks = {week_key(day) for day in dirty}
+        months = {month_key(day) for day in dirty}
+        for key in weeks:
+            self.weeks.pop(key, None)
+        for key in months:
+            self.months.pop(key, None)
+        for day_str, record in self.days.items():
+            day = date.fromisoformat(day_str)
+            wk, mk = week_key(day), month_key(day)
+            if wk in weeks:
+                _merge(self.weeks.setdefault(wk, {"active": 0.0, "apps": {}}), record)
+            if mk in months:
+                _merge(self.months.setdefault(mk, {"active": 0.0, "apps": {}}), record)
+
+    def query(self, start: date, end: date) -> ActivitySnapshot:
+        """Aggregate usage over ``start``..``end`` inclusive, using month rollups where possible."""
+        total = {"active": 0.0, "apps": {}}
+        with self.lock:
+            day = start
+            while day <= end:
+                month_end = (day.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+                if day.day == 1 and month_end <= end:
+                    rollup = self.months.get(month_key(day))
+                    if rollup:
+                        _merge(total, rollup)
+                    day = month_end + timedelta(days=1)
+                    continue
+                week_end = day + timedelta(days=6)
+                if day.weekday() == 0 and week_end <= end:
+                    rollup = self.weeks.get(week_key(day))
+                    if rollup:
+                        _merge(total, rollup)
+                    day = week_end + timedelta(days=1)
+                    continue
+                record = self.days.get(day.isoformat())
+                if record:
+                    _merge(total, record)
+                day += timedelta(days=1)
+        return ActivitySnapshot(
+            active_seconds=total["active"],
+            per_app_seconds=total["apps"],
+            day=start,
+            end_day=end,
+        )
+
+
+class StoreHistory(History):
+    """History answered by an indexed day store (SQLite); no index file to keep in sync."""
+
+    def __init__(self, store) -> None:
+        self.store = store
+
+    def query(self, start: date, end: date) -> ActivitySnapshot:
+        active, per_exe = self.store.usage(start, end)
+        return ActivitySnapshot(active_seconds=active, per_app_seconds=per_exe, day=start, end_day=end)
+
+    def top(self, start: date, end: date, n: int) -> List[Tuple[str, float]]:
+        return self.store.top_exes(start, end, n)
+
+
+def open_history(store, data_dir: Path) -> History:
+    return StoreHistory(store) if store.indexed else HistoryIndex(data_dir)
@@ -0,0 +1,233 @@
+"""Household-wide usage: a small collector plus the per-machine upload client.
+
+Every tracker instance sends its activity deltas to one collector over HTTP
+(gzip-compressed JSON batches). The collector merges them per child and day
+and answers each upload with the combined household totals, which the app
+uses to enforce limits across all of a child's machines.
+
+Batches carry a per-machine sequence number, so a batch that is resent after
+a lost response is counted once. Batches that cannot be delivered stay in a
+spool file and are retried on the next upload, including after a restart.
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import metrics
+
+KEEP_DAYS = 31
+MAX_SPOOLED_BATCHES = 10_000
+
+UPLOAD_SECONDS = metrics.registry.histogram("household_upload_seconds", "Household collector upload round trip")
+UPLOAD_FAILURES = metrics.registry.counter("household_upload_failures_total", "Failed household uploads")
+
+
+class HouseholdCollector(metrics.LocalHTTPServer):
+    """HTTP collector that merges tracker deltas per child.
+
+    ``POST /deltas`` takes a gzip JSON body
+    ``{"child", "machine", "batches": [{"seq", "days": {day: {"active"}}}]}``
+    and returns the child's household totals; ``GET /usage?child=<name>``
+    returns the same totals without uploading anything.
+    """
+
+    def __init__(self, data_dir: Path, port: int = 8765, host: str = "127.0.0.1") -> None:
+        self.data_dir = data_dir
+        self.state_path = data_dir / "collector_state.json"
+        self.lock = threading.Lock()
+        self.children: Dict[str, Dict] = {}
+        self._load()
+        super().__init__(port, host)
+
+    def _load(self) -> None:
+        try:
+            self.children = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.children = {}
+        # Older collectors also kept per-title totals that nothing reads.
+        for state in self.children.values():
+            for entry in state.get("days", {}).values():
+                entry.pop("apps", None)
+
+    def _save(self) -> None:
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self.children), encoding="utf-8")
+        os.replace(tmp, self.state_path)
+
+    def ingest(self, child: str, machine: str, batches: List[Dict]) -> Dict:
+        """Merge ``batches`` from one machine and return the child's totals."""
+        with self.lock:
+            state = self.children.setdefault(child, {"seq": {}, "days": {}})
+            last_seq = state["seq"].get(machine, 0)
+            changed = False
+            for batch in sorted(batches, key=lambda b: b["seq"]):
+                if batch["seq"] <= last_seq:
+                    # Already applied: the client missed our previous response.
+                    continue
+                last_seq = batch["seq"]
+                for day, totals in batch.get("days", {}).items():
+                    active = totals.get("active", 0.0)
+                    entry = state["days"].setdefault(day, {"active": 0.0, "machines": {}})
+                    entry["active"] += active
+                    machines = entry["machines"]
+                    machines[machine] = machines.get(machine, 0.0) + active
+                changed = True
+            if changed:
+                state["seq"][machine] = last_seq
+                self._prune(state)
+                try:
+                    self._save()
+                except OSError:
+                    pass
+            return self._totals(child, state)
+
+    def usage(self, child: str) -> Dict:
+        with self.lock:
+            return self._totals(child, self.children.get(child, {"days": {}}))
+
+    def _prune(self, state: Dict) -> None:
+        cutoff = (date.today() - timedelta(days=KEEP_DAYS)).isoformat()
+        for day in [day for day in state["days"] if day < cutoff]:
+            del state["days"][day]
+
+    def _totals(self, child: str, state: Dict) -> Dict:
+        days = {
+            day: {"active": entry["active"], "machines": dict(entry["machines"])}
+            for day, entry in state["days"].items()
+        }
+        return {"child": child, "days": days}
+
+    def do_POST(self, request) -> None:
+        if request.path != "/deltas":
+            request.send_error(404)
+            return
+        try:
+            raw = request.rfile.read(int(request.headers.get("Content-Length", 0)))
+            if request.headers.get("Content-Encoding") == "gzip":
+                raw = gzip.decompress(raw)
+            payload = json.loads(raw)
+            result = self.ingest(str(payload["child"]), str(payload["machine"]), payload["batches"])
+        except (OSError, ValueError, KeyError, TypeError):
+            request.send_error(400)
+            return
+        self.reply(request, json.dumps(result).encode("utf-8"))
+
+    def do_GET(self, request) -> None:
+        import urllib.parse
+
+        path, _, query = request.path.partition("?")
+        params = dict(part.split("=", 1) for part in query.split("&") if "=" in part)
+        if path != "/usage" or "child" not in params:
+            request.send_error(404)
+            return
+        self.reply(request, json.dumps(self.usage(urllib.parse.unquote(params["child"]))).encode("utf-8"))
+
+
+class HouseholdClient:
+    """Buffers this machine's deltas and uploads them to a :class:`HouseholdCollector`.
+
+    ``record`` matches :meth:`ActivityTracker.subscribe` and only adds to an
+    in-memory per-day total; ``upload`` (called from a scheduler job) seals
+    that into a batch, sends every unacknowledged batch in one request and
+    caches the household totals from the reply.
+    """
+
+    def __init__(self, url: str, child: str, machine: str, spool_path: Path, timeout: float = 10.0) -> None:
+        self.url = url.rstrip("/") + "/deltas"
+        self.child = child
+        self.machine = machine
+        self.spool_path = spool_path
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.current: Dict[str, Dict] = {}
+        self.unsent: List[Dict] = self._load_spool()
+        self.household: Dict[str, float] = {}
+        self._seq = max([batch["seq"] for batch in self.unsent], default=0)
+        self.last_upload: Optional[float] = None
+
+    def _load_spool(self) -> List[Dict]:
+        try:
+            return json.loads(self.spool_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return []
+
+    def _save_spool(self) -> None:
+        try:
+            if not self.unsent:
+                self.spool_path.unlink(missing_ok=True)
+                return
+            tmp = self.spool_path.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(self.unsent), encoding="utf-8")
+            os.replace(tmp, self.spool_path)
+        except OSError:
+            pass
+
+    def record(self, day: str, app: str, seconds: float, start: float = 0.0, end: float = 0.0) -> None:
+        with self.lock:
+            # Only the active total is shared: the collector enforces household limits on nothing else.
+            entry = self.current.setdefault(day, {"active": 0.0})
+            entry["active"] += seconds
+
+    def _next_seq(self) -> int:
+        # Millisecond timestamps keep sequence numbers increasing across restarts
+        # even if the spool file is lost.
+        self._seq = max(self._seq + 1, int(time.time() * 1000))
+        return self._seq
+
+    def _seal(self) -> List[Dict]:
+        with self.lock:
+            if self.current:
+                self.unsent.append({"seq": self._next_seq(), "days": self.current})
+                self.current = {}
+                del self.unsent[:-MAX_SPOOLED_BATCHES]
+            return list(self.unsent)
+
+    def upload(self) -> bool:
+        """Send pending batches (or just poll totals); returns False if the collector is unreachable."""
+        # urllib pulls in http.client, email and ssl; only load it once an upload is due.
+        import http.client
+        import urllib.error
+        import urllib.request
+
+        batches = self._seal()
+        payload = json.dumps({"child": self.child, "machine": self.machine, "batches": batches})
+        request = urllib.request.Request(
+            self.url,
+            data=gzip.compress(payload.encode("utf-8")),
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+        )
+        began = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                result = json.loads(response.read())
+        except (OSError, ValueError, urllib.error.URLError, http.client.HTTPException):
+            # HTTPException covers a collector that drops the connection mid-response.
+            UPLOAD_FAILURES.inc()
+            self._save_spool()
+            return False
+        UPLOAD_SECONDS.observe(time.perf_counter() - began)
+        sent = {batch["seq"] for batch in batches}
+        with self.lock:
+            self.unsent = [batch for batch in self.unsent if batch["seq"] not in sent]
+            self.household = {day: totals["active"] for day, totals in result.get("days", {}).items()}
+        self._save_spool()
+        self.last_upload = time.time()
+        return True
+
+    def active_seconds(self, day: str) -> float:
+        """Household total for ``day``: the collector's last answer plus what it has not seen yet."""
+        with self.lock:
+            pending = sum(batch["days"].get(day, {}).get("active", 0.0) for batch in self.unsent)
+            pending += self.current.get(day, {}).get("active", 0.0)
+            return self.household.get(day, 0.0) + pending
+
+    def close(self) -> None:
+        self._seal()
+        self._save_spool()
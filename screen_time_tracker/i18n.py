@@ -9,6 +9,7 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         "tray_title": "Screen Time Tracker",
         "tray_send_now": "Send report now",
         "tray_open_folder": "Open data folder",
+        "tray_profile": "Profile for 30 s",
         "tray_exit": "Exit",
         "notify_screenshot_title": "Screenshot saved",
         "notify_screenshot_body": "{filename} saved for monitoring",
@@ -24,12 +25,20 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         "notify_report_sent_body": "Daily screen time report emailed.",
         "notify_report_failed_title": "Report failed",
         "notify_report_failed_body": "Could not send report. Check email settings.",
+        "notify_rule_title": "Limit: {name}",
+        "notify_rule_budget_body": "{minutes} min used today. Time to stop.",
+        "notify_rule_window_body": "Not allowed between {start} and {end}.",
+        "notify_rule_session_body": "{minutes} min without a break. Take a pause.",
+        "notify_profile_title": "Profile saved",
+        "notify_profile_body": "{filename} written to the data folder",
         "email_subject": "Screen time report {date}",
+        "email_digest_subject": "Screen time summary {start} – {end}",
     },
     "ru": {
         "tray_title": "Трекер экранного времени",
         "tray_send_now": "Отправить отчет",
         "tray_open_folder": "Открыть папку данных",
+        "tray_profile": "Профилировать 30 с",
         "tray_exit": "Выход",
         "notify_screenshot_title": "Скриншот сохранен",
         "notify_screenshot_body": "{filename} сохранен для мониторинга",
@@ -45,7 +54,14 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         "notify_report_sent_body": "Ежедневный отчет отправлен на email.",
         "notify_report_failed_title": "Ошибка отправки отчета",
         "notify_report_failed_body": "Не удалось отправить письмо. Проверь настройки.",
+        "notify_rule_title": "Ограничение: {name}",
+        "notify_rule_budget_body": "Сегодня использовано {minutes} мин. Пора заканчивать.",
+        "notify_rule_window_body": "Не разрешено с {start} до {end}.",
+        "notify_rule_session_body": "{minutes} мин без перерыва. Сделайте паузу.",
+        "notify_profile_title": "Профиль сохранен",
+        "notify_profile_body": "{filename} записан в папку данных",
         "email_subject": "Отчет об экранном времени {date}",
+        "email_digest_subject": "Сводка экранного времени {start} — {end}",
     },
 }
 
@@ -0,0 +1,253 @@
+"""Where the tracker learns about user input.
+
+Two kinds of source:
+
+* pull sources ask the OS how long the user has been idle
+  (``GetLastInputInfo`` on Windows, the X screensaver extension or the logind
+  idle hint on Linux). The tracker calls :meth:`IdleSource.idle_seconds` once
+  per tick while active; while idle it polls after ``poll_interval`` seconds
+  and doubles the gap up to the idle threshold, so they cost a syscall per
+  second instead of a Python callback per input event and almost nothing
+  during a long break;
+* push sources (the pynput hooks) report input events through an
+  :class:`~screen_time_tracker.tracker.ActivitySignal`.
+
+:func:`select_idle_source` picks the cheapest source that works here.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import platform
+import shutil
+import subprocess
+import time
+from bisect import bisect_right
+from typing import Callable, Iterable, List, Optional
+
+AUTO = "auto"
+
+
+class IdleSource:
+    name = ""
+    # Pull sources return idle times; push sources call the tracker instead.
+    pull = True
+    # First gap between polls once the user is idle; the tracker doubles it up to the idle
+    # threshold, which bounds how late the idle -> active edge is seen.
+    poll_interval = 2.0
+
+    @classmethod
+    def available(cls) -> bool:
+        return False
+
+    def start(self, tracker) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def idle_seconds(self) -> Optional[float]:
+        """Seconds since the last input, or ``None`` if there is nothing new to report."""
+        return None
+
+
+class Win32IdleSource(IdleSource):
+    name = "win32"
+
+    class _LastInputInfo(ctypes.Structure):
+        _fields_ = [("cbSize", ctypes.c_uint), ("dwTime", ctypes.c_uint)]
+
+    @classmethod
+    def available(cls) -> bool:
+        return platform.system() == "Windows" and hasattr(ctypes, "windll")
+
+    def start(self, tracker) -> None:
+        self._user32 = ctypes.windll.user32
+        self._kernel32 = ctypes.windll.kernel32
+        self._kernel32.GetTickCount.restype = ctypes.c_uint
+        self._info = self._LastInputInfo()
+        self._info.cbSize = ctypes.sizeof(self._info)
+        if self.idle_seconds() is None:
+            raise OSError("GetLastInputInfo failed")
+
+    def idle_seconds(self) -> Optional[float]:
+        if not self._user32.GetLastInputInfo(ctypes.byref(self._info)):
+            return None
+        # Both are 32-bit millisecond tick counts; the mask handles the 49-day wraparound.
+        return ((self._kernel32.GetTickCount() - self._info.dwTime) & 0xFFFFFFFF) / 1000.0
+
+
+class X11IdleSource(IdleSource):
+    name = "x11"
+
+    class _ScreenSaverInfo(ctypes.Structure):
+        _fields_ = [
+            ("window", ctypes.c_ulong),
+            ("state", ctypes.c_int),
+            ("kind", ctypes.c_int),
+            ("til_or_since", ctypes.c_ulong),
+            ("idle", ctypes.c_ulong),
+            ("eventMask", ctypes.c_ulong),
+        ]
+
+    @classmethod
+    def available(cls) -> bool:
+        return bool(os.environ.get("DISPLAY")) and bool(ctypes.util.find_library("Xss"))
+
+    def start(self, tracker) -> None:
+        xlib = ctypes.cdll.LoadLibrary(ctypes.util.find_library("X11"))
+        xss = ctypes.cdll.LoadLibrary(ctypes.util.find_library("Xss"))
+        xlib.XOpenDisplay.restype = ctypes.c_void_p
+        xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+        xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        xss.XScreenSaverAllocInfo.restype = ctypes.POINTER(self._ScreenSaverInfo)
+        xss.XScreenSaverQueryInfo.argtypes = [
+            ctypes.c_void_p,
+            ctypes.c_ulong,
+            ctypes.POINTER(self._ScreenSaverInfo),
+        ]
+        display = xlib.XOpenDisplay(None)
+        if not display:
+            raise OSError("Cannot open X display")
+        self._xlib, self._xss, self._display = xlib, xss, display
+        self._root = xlib.XDefaultRootWindow(display)
+        self._info = xss.XScreenSaverAllocInfo()
+        if self.idle_seconds() is None:
+            self.stop()
+            raise OSError("XScreenSaver extension not available")
+
+    def stop(self) -> None:
+        if getattr(self, "_display", None):
+            self._xlib.XCloseDisplay(self._display)
+            self._display = None
+
+    def idle_seconds(self) -> Optional[float]:
+        if not self._display or not self._xss.XScreenSaverQueryInfo(self._display, self._root, self._info):
+            return None
+        return self._info.contents.idle / 1000.0
+
+
+class LogindIdleSource(IdleSource):
+    """systemd-logind ``IdleHint``; coarse (set by the desktop), so it is queried at most every ``min_interval``."""
+
+    name = "logind"
+    poll_interval = 10.0
+    min_interval = 10.0
+
+    @classmethod
+    def available(cls) -> bool:
+        return platform.system() == "Linux" and shutil.which("loginctl") is not None
+
+    def start(self, tracker) -> None:
+        self._session = os.environ.get("XDG_SESSION_ID", "auto")
+        self._queried = float("-inf")
+        self._query()
+        if self._last is None:
+            raise OSError("logind idle hint not available")
+
+    def _query(self) -> None:
+        self._queried = time.monotonic()
+        self._last = None
+        try:
+            output = subprocess.run(
+                ["loginctl", "show-session", self._session, "-p", "IdleHint", "-p", "IdleSinceHintMonotonic"],
+                capture_output=True,
+                text=True,
+                timeout=2,
+            ).stdout
+        except (OSError, subprocess.SubprocessError):
+            return
+        values = dict(line.split("=", 1) for line in output.splitlines() if "=" in line)
+        if values.get("IdleHint") == "no":
+            self._last = 0.0
+        elif values.get("IdleHint") == "yes" and values.get("IdleSinceHintMonotonic", "0") != "0":
+            # logind reports CLOCK_MONOTONIC microseconds, the clock time.monotonic() reads on Linux.
+            self._last = max(time.monotonic() - int(values["IdleSinceHintMonotonic"]) / 1e6, 0.0)
+
+    def idle_seconds(self) -> Optional[float]:
+        if time.monotonic() - self._queried < self.min_interval:
+            return None
+        self._query()
+        return self._last
+
+
+class HookIdleSource(IdleSource):
+    """pynput global keyboard and mouse hooks: precise but one Python callback per input event."""
+
+    name = "hooks"
+    pull = False
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            from pynput import keyboard, mouse  # noqa: F401
+        except Exception:
+            return False
+        return True
+
+    def start(self, tracker) -> None:
+        from pynput import keyboard, mouse
+
+        self.listeners = []
+        kb = tracker._signal("keyboard")
+        kb_listener = keyboard.Listener(on_press=kb.hit, on_release=kb.hit)
+        kb_listener.start()
+        self.listeners.append(kb_listener)
+        ms = tracker._signal("mouse")
+        mouse_listener = mouse.Listener(on_move=ms.hit, on_click=ms.hit, on_scroll=ms.hit)
+        mouse_listener.start()
+        self.listeners.append(mouse_listener)
+
+    def stop(self) -> None:
+        for listener in getattr(self, "listeners", []):
+            try:
+                listener.stop()
+            except Exception:
+                continue
+
+
+class ScriptedIdleSource(IdleSource):
+    """Deterministic pull source for tests: input happens at the given times on ``clock.monotonic()``."""
+
+    name = "scripted"
+    poll_interval = 1.0
+
+    def __init__(self, clock, inputs: Iterable[float] = ()) -> None:
+        self.clock = clock
+        self.inputs: List[float] = sorted(inputs)
+
+    @classmethod
+    def available(cls) -> bool:
+        # Never picked automatically.
+        return False
+
+    def add_input(self, at: Optional[float] = None) -> None:
+        self.inputs.append(self.clock.monotonic() if at is None else at)
+        self.inputs.sort()
+
+    def idle_seconds(self) -> Optional[float]:
+        now = self.clock.monotonic()
+        index = bisect_right(self.inputs, now)
+        if index == 0:
+            return None
+        return now - self.inputs[index - 1]
+
+
+# Cheapest first.
+SOURCES = (Win32IdleSource, X11IdleSource, LogindIdleSource, HookIdleSource)
+
+
+def select_idle_source(preferred: str = AUTO, tracker=None) -> Optional[IdleSource]:
+    """Start and return the preferred source, else the cheapest one that starts; ``None`` if none does."""
+    ordered = sorted(SOURCES, key=lambda source: source.name != preferred)
+    candidates: List[Callable[[], IdleSource]] = [source for source in ordered if source.available()]
+    for factory in candidates:
+        source = factory()
+        try:
+            source.start(tracker)
+        except Exception:
+            continue
+        return source
+    return None
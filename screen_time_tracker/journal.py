@@ -0,0 +1,108 @@
+import json
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from .clock import SystemClock
+
+
+class ActivityJournal:
+    """Append-only, line-delimited log of activity deltas.
+
+    Deltas are batched in memory and appended as one compact JSON line per day
+    every ``flush_interval`` seconds; ``fsync`` runs at most once per
+    ``fsync_interval``. Every record carries a sequence number so replay can
+    skip records already folded into a day checkpoint.
+    """
+
+    def __init__(self, path: Path, flush_interval: float = 30.0, fsync_interval: float = 120.0, clock=None) -> None:
+        self.path = path
+        self.clock = clock or SystemClock()
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.seq = 0
+        self._pending: Dict[str, Dict] = {}
+        self._file = None
+        self._last_flush = self.clock.monotonic()
+        self._last_fsync = self.clock.monotonic()
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    def seconds_until_flush(self, now: Optional[float] = None) -> float:
+        now = self.clock.monotonic() if now is None else now
+        return self._last_flush + self.flush_interval - now
+
+    def record(self, day: str, app: str, seconds: float, start: Optional[float] = None, end: Optional[float] = None) -> None:
+        batch = self._pending.get(day)
+        if batch is None:
+            batch = self._pending[day] = {"active": 0.0, "apps": defaultdict(float), "iv": []}
+        batch["active"] += seconds
+        batch["apps"][app] += seconds
+        if start is None or end is None:
+            return
+        intervals = batch["iv"]
+        if intervals and intervals[-1][2] == app and start - intervals[-1][1] <= 2.0:
+            intervals[-1][1] = max(intervals[-1][1], end)
+        else:
+            intervals.append([start, end, app])
+
+    def maybe_flush(self, now: Optional[float] = None) -> None:
+        if self._pending and self.seconds_until_flush(now) <= 0:
+            self.flush()
+
+    def flush(self, sync: bool = False) -> None:
+        now = self.clock.monotonic()
+        self._last_flush = now
+        if not self._pending:
+            return
+        lines = []
+        for day, batch in self._pending.items():
+            self.seq += 1
+            record = {"seq": self.seq, "day": day, "active": batch["active"], "apps": batch["apps"], "iv": batch["iv"]}
+            lines.append(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+        self._pending = {}
+        handle = self._open()
+        handle.write("\n".join(lines) + "\n")
+        handle.flush()
+        if sync or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(handle.fileno())
+            self._last_fsync = now
+
+    def discard_pending(self) -> None:
+        """Drop unflushed deltas once a checkpoint has captured them."""
+        self._pending = {}
+
+    def truncate(self) -> None:
+        self.close()
+        with open(self.path, "w", encoding="utf-8") as handle:
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def replay(self) -> Iterator[Dict]:
+        if not self.path.exists():
+            return
+        with open(self.path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn final line after a crash.
+                    continue
+                self.seq = max(self.seq, int(record.get("seq", 0)))
+                yield record
+
+    def close(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.close()
+            finally:
+                self._file = None
+
+    def _open(self):
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
@@ -0,0 +1,252 @@
+"""Process-wide counters, gauges and histograms with Prometheus and JSON output.
+
+Recording is a plain attribute update (plus a bisect for histograms) with no
+locking: the GIL keeps single updates consistent and an occasional lost
+increment under contention is acceptable for diagnostics.
+"""
+
+import json
+import os
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+SIZE_BUCKETS = (10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000, 10_000_000)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels_text(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Gauge:
+    """Settable gauge, or a callback gauge when ``fn`` is given (read only at export time)."""
+
+    __slots__ = ("value", "fn")
+    kind = "gauge"
+
+    def __init__(self, fn: Optional[Callable[[], float]] = None) -> None:
+        self.value = 0.0
+        self.fn = fn
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def read(self) -> float:
+        if self.fn is None:
+            return self.value
+        try:
+            return float(self.fn())
+        except Exception:
+            return float("nan")
+
+    def samples(self, name: str, labels: Labels) -> List[str]:
+        return [f"{name}{_labels_text(labels)} {self.read()}"]
+
+    def to_json(self):
+        return self.read()
+
+
+class Counter(Gauge):
+    """Monotonic counter; a callback counter exposes a total kept elsewhere at no recording cost."""
+
+    __slots__ = ()
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+    kind = "histogram"
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str, labels: Labels) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            bucket_labels = _labels_text(labels, 'le="%s"' % bound)
+            lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+        inf_labels = _labels_text(labels, 'le="+Inf"')
+        lines.append(f"{name}_bucket{inf_labels} {self.count}")
+        lines.append(f"{name}_sum{_labels_text(labels)} {self.sum}")
+        lines.append(f"{name}_count{_labels_text(labels)} {self.count}")
+        return lines
+
+    def to_json(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+
+class Registry:
+    def __init__(self, prefix: str = "screen_tracker_") -> None:
+        self.prefix = prefix
+        self._metrics: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str, help_text: str, labels: Optional[Dict[str, str]], factory):
+        key: Labels = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            family = self._metrics.setdefault(self.prefix + name, {"help": help_text, "series": {}})
+            metric = family["series"].get(key)
+            if metric is None:
+                metric = family["series"][key] = factory()
+            return metric
+
+    def counter(
+        self,
+        name: str,
+        help_text: str = "",
+        labels: Optional[Dict[str, str]] = None,
+        fn: Optional[Callable[[], float]] = None,
+    ) -> Counter:
+        counter = self._get(name, help_text, labels, lambda: Counter(fn))
+        if fn is not None:
+            counter.fn = fn
+        return counter
+
+    def gauge(
+        self,
+        name: str,
+        help_text: str = "",
+        labels: Optional[Dict[str, str]] = None,
+        fn: Optional[Callable[[], float]] = None,
+    ) -> Gauge:
+        gauge = self._get(name, help_text, labels, lambda: Gauge(fn))
+        if fn is not None:
+            gauge.fn = fn
+        return gauge
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str = "",
+        labels: Optional[Dict[str, str]] = None,
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._get(name, help_text, labels, lambda: Histogram(buckets))
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            families = [(name, family["help"], list(family["series"].items())) for name, family in self._metrics.items()]
+        for name, help_text, series in sorted(families):
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {series[0][1].kind}")
+            for labels, metric in series:
+                lines.extend(metric.samples(name, labels))
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> Dict:
+        result = {}
+        with self._lock:
+            families = [(name, list(family["series"].items())) for name, family in self._metrics.items()]
+        for name, series in families:
+            for labels, metric in series:
+                result[name + _labels_text(labels)] = metric.to_json()
+        return result
+
+    def dump_json(self, path: Path) -> None:
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self.to_dict(), indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+registry = Registry()
+
+
+class LocalHTTPServer:
+    """Small threaded HTTP server; subclasses implement ``do_GET``/``do_POST(request)``.
+
+    ``request`` is the ``BaseHTTPRequestHandler`` of the connection. Access
+    logging is off: these servers are polled often and run in the background.
+    """
+
+    def __init__(self, port: int, host: str = "127.0.0.1") -> None:
+        # Imported here: the tracker imports this module at startup, the servers are optional.
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.do_GET(self)
+
+            def do_POST(self):
+                server.do_POST(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def do_GET(self, request) -> None:
+        request.send_error(404)
+
+    def do_POST(self, request) -> None:
+        request.send_error(404)
+
+    @staticmethod
+    def reply(
+        request, body: bytes, content_type: str = "application/json", headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        request.send_response(200)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(body)
+
+    def serve_forever(self) -> None:
+        self.httpd.serve_forever()
+
+    def start(self) -> None:
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class MetricsServer(LocalHTTPServer):
+    """Serves ``/metrics`` (Prometheus text) and ``/metrics.json`` on localhost."""
+
+    def __init__(self, port: int, metrics: Registry = registry, host: str = "127.0.0.1") -> None:
+        self.metrics = metrics
+        super().__init__(port, host)
+
+    def do_GET(self, request) -> None:
+        if request.path == "/metrics":
+            self.reply(request, self.metrics.to_prometheus().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+        elif request.path == "/metrics.json":
+            self.reply(request, json.dumps(self.metrics.to_dict()).encode("utf-8"))
+        else:
+            request.send_error(404)
@@ -1,21 +1,147 @@
+import logging
 import platform
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Tuple
 
-try:
-    from win10toast import ToastNotifier
-except Exception:  # pragma: no cover - used only on Windows
-    ToastNotifier = None
+logger = logging.getLogger(__name__)
 
+# A queued notification with one of these keys makes pending ones with the listed keys pointless.
+SUPERSEDES: Dict[str, Tuple[str, ...]] = {
+    "hard_limit": ("soft_limit", "warning", "break"),
+    "soft_limit": ("warning",),
+    "report_sent": ("report_failed",),
+    "report_failed": ("report_sent",),
+}
 
-class Notifier:
+
+class ToastBackend:
     def __init__(self) -> None:
-        self.enabled = platform.system() == "Windows" and ToastNotifier is not None
-        self.notifier = ToastNotifier() if self.enabled else None
+        from win10toast import ToastNotifier
 
-    def notify(self, title: str, message: str, duration: int = 5) -> None:
-        if not self.enabled:
-            return
+        self.notifier = ToastNotifier()
+
+    def show(self, title: str, message: str, duration: int) -> None:
+        # Use non-threaded mode to avoid Win32 WNDPROC errors in some environments;
+        # this only blocks the dispatcher thread.
+        self.notifier.show_toast(title, message, duration=duration, threaded=False)
+
+
+class LogBackend:
+    """Writes notifications to the log; keeps the most recent ones for inspection."""
+
+    def __init__(self, keep: int = 100) -> None:
+        self.sent = deque(maxlen=keep)
+
+    def show(self, title: str, message: str, duration: int) -> None:
+        self.sent.append((title, message))
+        logger.info("%s: %s", title, message)
+
+
+def default_backend():
+    if platform.system() == "Windows":
         try:
-            # Use non-threaded mode to avoid Win32 WNDPROC errors in some environments.
-            self.notifier.show_toast(title, message, duration=duration, threaded=False)
-        except Exception:
+            return ToastBackend()
+        except Exception:  # pragma: no cover - win10toast missing
             pass
+    return LogBackend()
+
+
+class Notifier:
+    """Queue of notifications served by a dispatcher thread.
+
+    :meth:`notify` only enqueues, so callers never wait for a toast. Pending
+    messages with the same key are replaced by the newest one, keys listed in
+    :data:`SUPERSEDES` drop the pending messages they make obsolete, and the
+    dispatcher shows at most one notification per ``min_interval`` seconds.
+    Without an explicit ``backend`` the default one (and win10toast with it)
+    is loaded by the dispatcher thread on the first notification.
+    """
+
+    def __init__(self, backend=None, min_interval: float = 2.0, max_pending: int = 16) -> None:
+        self.backend = backend
+        self.enabled = True
+        self.min_interval = min_interval
+        self.max_pending = max_pending
+        self.queued = 0
+        self.coalesced = 0
+        self.superseded = 0
+        self.dropped = 0
+        self.delivered = 0
+        self._pending: "OrderedDict[str, Tuple[str, str, int]]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = True
+        self._last_shown = 0.0
+
+    def notify(self, title: str, message: str, duration: int = 5, key: Optional[str] = None) -> None:
+        if not self.enabled:
+            return
+        key = key or title
+        with self._cond:
+            self.queued += 1
+            for obsolete in SUPERSEDES.get(key, ()):
+                if self._pending.pop(obsolete, None) is not None:
+                    self.superseded += 1
+            if any(key in SUPERSEDES.get(other, ()) for other in self._pending):
+                self.superseded += 1
+                return
+            if key in self._pending:
+                self.coalesced += 1
+                del self._pending[key]
+            self._pending[key] = (title, message, duration)
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+                self.dropped += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch_loop, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _dispatch_loop(self) -> None:
+        if self.backend is None:
+            self.backend = default_backend()
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                wait = self._last_shown + self.min_interval - time.monotonic()
+                if wait > 0:
+                    # Rate limit: newer messages may still coalesce while we wait.
+                    self._cond.wait(wait)
+                    continue
+                _, (title, message, duration) = self._pending.popitem(last=False)
+            try:
+                self.backend.show(title, message, duration)
+                self.delivered += 1
+            except Exception:
+                pass
+            self._last_shown = time.monotonic()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until the queue is empty; mainly for tests and shutdown."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._cond:
+                if not self._pending:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def stop(self) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self.queued,
+            "coalesced": self.coalesced,
+            "superseded": self.superseded,
+            "dropped": self.dropped,
+            "delivered": self.delivered,
+            "pending": len(self._pending),
+        }
@@ -0,0 +1,181 @@
+import json
+import os
+import smtplib
+import threading
+import time
+import uuid
+from email import policy
+from email.message import EmailMessage
+from email.parser import BytesParser
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from . import metrics
+from .config import AppConfig
+from .emailer import open_smtp
+
+
+SMTP_SECONDS = metrics.registry.histogram("smtp_send_seconds", "Time to send one message")
+SMTP_CONNECT_SECONDS = metrics.registry.histogram("smtp_connect_seconds", "Time to connect and log in")
+SMTP_FAILURES = metrics.registry.counter("smtp_failures_total", "Failed delivery attempts")
+OUTBOX_DELIVERED = metrics.registry.counter("smtp_delivered_total", "Delivered messages")
+
+
+class Outbox:
+    """Disk-spooled email queue delivered by a background worker.
+
+    Each message is stored as ``<id>.eml`` plus a ``<id>.json`` sidecar with
+    the attempt count and next retry time, so queued mail survives restarts.
+    All due messages are sent over one authenticated connection; failures are
+    retried with exponential backoff and moved to ``failed/`` after
+    ``max_attempts``. ``connect`` returns a context manager yielding an SMTP
+    session and can be replaced with a fake server in tests.
+    """
+
+    def __init__(
+        self,
+        config: AppConfig,
+        spool_dir: Path,
+        on_delivered: Optional[Callable[[str], None]] = None,
+        on_failed: Optional[Callable[[str, int, bool], None]] = None,
+        base_delay: float = 30.0,
+        max_delay: float = 3600.0,
+        max_attempts: int = 12,
+        connect: Optional[Callable] = None,
+    ) -> None:
+        self.config = config
+        self.spool_dir = spool_dir
+        self.on_delivered = on_delivered
+        self.on_failed = on_failed
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.connect = connect or (lambda: open_smtp(self.config))
+        self.delivered = 0
+        self.failures = 0
+        self.connections = 0
+        self.running = False
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self.running = True
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def stop(self) -> None:
+        self.running = False
+        self._wake.set()
+
+    def enqueue(self, msg: EmailMessage) -> str:
+        message_id = f"{int(time.time() * 1000):015d}-{uuid.uuid4().hex[:8]}"
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        eml = self.spool_dir / f"{message_id}.eml"
+        tmp = eml.with_suffix(".eml.tmp")
+        tmp.write_bytes(msg.as_bytes(policy=policy.SMTP))
+        os.replace(tmp, eml)
+        self._write_meta(message_id, {"attempts": 0, "next_attempt": 0.0})
+        self._wake.set()
+        return message_id
+
+    def pending(self) -> List[str]:
+        return sorted(path.stem for path in self.spool_dir.glob("*.eml"))
+
+    def _meta_path(self, message_id: str) -> Path:
+        return self.spool_dir / f"{message_id}.json"
+
+    def _read_meta(self, message_id: str) -> Dict:
+        try:
+            return json.loads(self._meta_path(message_id).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {"attempts": 0, "next_attempt": 0.0}
+
+    def _write_meta(self, message_id: str, meta: Dict) -> None:
+        path = self._meta_path(message_id)
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _loop(self) -> None:
+        while self.running:
+            delay = self.deliver_due()
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def deliver_due(self, now: Optional[float] = None) -> Optional[float]:
+        """Send every due message over one connection; returns seconds until the next retry."""
+        with self._lock:
+            now = time.time() if now is None else now
+            due, next_retry = [], None
+            for message_id in self.pending():
+                meta = self._read_meta(message_id)
+                if meta["next_attempt"] <= now:
+                    due.append((message_id, meta))
+                else:
+                    wait = meta["next_attempt"] - now
+                    next_retry = wait if next_retry is None else min(next_retry, wait)
+            if not due:
+                return next_retry
+            try:
+                began = time.perf_counter()
+                with self.connect() as server:
+                    SMTP_CONNECT_SECONDS.observe(time.perf_counter() - began)
+                    self.connections += 1
+                    while due:
+                        message_id, meta = due[0]
+                        try:
+                            began = time.perf_counter()
+                            server.send_message(self._load(message_id))
+                            SMTP_SECONDS.observe(time.perf_counter() - began)
+                        except smtplib.SMTPServerDisconnected:
+                            raise
+                        except smtplib.SMTPException:
+                            # Rejected by the server: retry this one, keep using the connection.
+                            self._failed(message_id, meta, now)
+                        else:
+                            self._delivered(message_id)
+                        due.pop(0)
+            except Exception:
+                # Connection-level failure: every message not yet sent waits for the next attempt.
+                for message_id, meta in due:
+                    self._failed(message_id, meta, now)
+            return self._next_retry_delay()
+
+    def _next_retry_delay(self) -> Optional[float]:
+        now = time.time()
+        waits = [self._read_meta(message_id)["next_attempt"] - now for message_id in self.pending()]
+        return max(min(waits), 0.0) if waits else None
+
+    def _load(self, message_id: str) -> EmailMessage:
+        data = (self.spool_dir / f"{message_id}.eml").read_bytes()
+        return BytesParser(policy=policy.default).parsebytes(data)
+
+    def _delivered(self, message_id: str) -> None:
+        for suffix in (".eml", ".json"):
+            try:
+                (self.spool_dir / f"{message_id}{suffix}").unlink()
+            except OSError:
+                pass
+        self.delivered += 1
+        OUTBOX_DELIVERED.inc()
+        if self.on_delivered:
+            self.on_delivered(message_id)
+
+    def _failed(self, message_id: str, meta: Dict, now: float) -> None:
+        self.failures += 1
+        SMTP_FAILURES.inc()
+        meta["attempts"] += 1
+        permanent = meta["attempts"] >= self.max_attempts
+        if permanent:
+            failed_dir = self.spool_dir / "failed"
+            failed_dir.mkdir(exist_ok=True)
+            for suffix in (".eml", ".json"):
+                try:
+                    os.replace(self.spool_dir / f"{message_id}{suffix}", failed_dir / f"{message_id}{suffix}")
+                except OSError:
+                    pass
+        else:
+            meta["next_attempt"] = now + min(self.base_delay * 2 ** (meta["attempts"] - 1), self.max_delay)
+            self._write_meta(message_id, meta)
+        if self.on_failed:
+            self.on_failed(message_id, meta["attempts"], permanent)
@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+import psutil
+
+
+class ProcessNameCache:
+    """Bounded LRU of process names keyed by PID.
+
+    A hit makes no OS calls. Every ``sweep_interval`` seconds the cached PIDs
+    are checked against their recorded creation time, dropping entries whose
+    process has exited or whose PID was reused, so a recycled PID can return
+    a stale name for at most one sweep interval.
+    """
+
+    def __init__(self, capacity: int = 64, sweep_interval: float = 60.0) -> None:
+        self.capacity = capacity
+        self.sweep_interval = sweep_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # pid -> (create_time, name)
+        self._entries: "OrderedDict[int, Tuple[float, str]]" = OrderedDict()
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+
+    def name(self, pid: int) -> str:
+        with self._lock:
+            self._maybe_sweep()
+            cached = self._entries.get(pid)
+            if cached is not None:
+                self._entries.move_to_end(pid)
+                self.hits += 1
+                return cached[1]
+        proc = psutil.Process(pid)
+        created, name = proc.create_time(), proc.name()
+        with self._lock:
+            self.misses += 1
+            self._entries[pid] = (created, name)
+            self._entries.move_to_end(pid)
+            while len(self._entries) > self.capacity:
+                self._evict(next(iter(self._entries)))
+        return name
+
+    def _evict(self, pid: int) -> None:
+        if self._entries.pop(pid, None) is not None:
+            self.evictions += 1
+
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        for pid, (created, _) in list(self._entries.items()):
+            try:
+                alive = psutil.Process(pid).create_time() == created
+            except psutil.Error:
+                alive = False
+            if not alive:
+                # Exited, or the PID now belongs to a newer process.
+                self._evict(pid)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
@@ -0,0 +1,124 @@
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+CONTROL_FILE = "profile.request"
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """On-demand sampling profiler over every thread of the process.
+
+    While running, a helper thread snapshots ``sys._current_frames()`` every
+    ``interval`` seconds for ``duration`` seconds, then writes a
+    flamegraph-compatible collapsed-stack file (``profile-*.folded``) and a
+    short text summary into ``out_dir``. Nothing runs while it is idle.
+    """
+
+    def __init__(
+        self,
+        out_dir: Path,
+        interval: float = 0.01,
+        duration: float = 30.0,
+        on_finished: Optional[Callable[[Path], None]] = None,
+    ) -> None:
+        self.out_dir = out_dir
+        self.interval = interval
+        self.duration = duration
+        self.on_finished = on_finished
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: Optional[float] = None) -> bool:
+        """Begin a bounded profiling run; returns False if one is already in progress."""
+        with self._lock:
+            if self.running:
+                return False
+            self._thread = threading.Thread(
+                target=self._run, args=(duration or self.duration,), name="profiler", daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def check_control_file(self, data_dir: Path) -> bool:
+        """Start a run if ``data_dir/profile.request`` exists (its content may give a duration)."""
+        request = data_dir / CONTROL_FILE
+        if not request.exists():
+            return False
+        try:
+            text = request.read_text(encoding="utf-8").strip()
+            request.unlink()
+        except OSError:
+            return False
+        try:
+            duration = float(text) if text else None
+        except ValueError:
+            duration = None
+        return self.start(duration)
+
+    def _run(self, duration: float) -> None:
+        stacks: Counter = Counter()
+        per_thread: Counter = Counter()
+        own = threading.get_ident()
+        started = time.monotonic()
+        cpu_started = time.process_time()
+        samples = 0
+        while time.monotonic() - started < duration:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                thread_name = names.get(ident, str(ident))
+                labels.append(thread_name)
+                stacks[";".join(reversed(labels))] += 1
+                per_thread[thread_name] += 1
+            samples += 1
+            time.sleep(self.interval)
+        elapsed = time.monotonic() - started
+        cpu = time.process_time() - cpu_started
+        path = self._write(stacks, per_thread, samples, elapsed, cpu)
+        if self.on_finished and path is not None:
+            try:
+                self.on_finished(path)
+            except Exception:
+                pass
+
+    def _write(self, stacks: Counter, per_thread: Counter, samples: int, elapsed: float, cpu: float) -> Optional[Path]:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        folded = self.out_dir / f"profile-{stamp}.folded"
+        summary = self.out_dir / f"profile-{stamp}.txt"
+        leaf: Dict[str, int] = Counter()
+        for stack, count in stacks.items():
+            leaf[stack.rsplit(";", 1)[-1]] += count
+        lines = [
+            f"samples: {samples} over {elapsed:.1f} s (interval {self.interval * 1000:.0f} ms)",
+            f"process CPU during run: {cpu:.2f} s ({100 * cpu / max(elapsed, 1e-9):.1f}% of one core)",
+            "",
+            "samples per thread:",
+        ]
+        lines += [f"  {count:6d}  {name}" for name, count in per_thread.most_common()]
+        lines += ["", "top frames (self):"]
+        lines += [f"  {count:6d}  {name}" for name, count in leaf.most_common(25)]
+        try:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            folded.write_text("".join(f"{stack} {count}\n" for stack, count in stacks.items()), encoding="utf-8")
+            summary.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        except OSError:
+            return None
+        return folded
@@ -0,0 +1,162 @@
+import html
+import io
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from .reporting import ReportModel, build_model, format_report_localized, seconds_to_hours_minutes
+from .tracker import ActivitySnapshot
+
+try:
+    from PIL import Image, ImageDraw
+except Exception:  # pragma: no cover - charts are optional
+    Image = None
+    ImageDraw = None
+
+CHART_TOP_APPS = 10
+HTML_MAX_ROWS = 200
+BAR_COLOR = (40, 120, 200)
+
+LABELS = {
+    "en": {
+        "title": "Screen time report",
+        "total": "Active time",
+        "apps": "Per application",
+        "hours": "By hour",
+        "app": "Application",
+        "time": "Time",
+        "more": "{count} more entries",
+    },
+    "ru": {
+        "title": "Отчет об экранном времени",
+        "total": "Активное время",
+        "apps": "По приложениям",
+        "hours": "По часам",
+        "app": "Приложение",
+        "time": "Время",
+        "more": "еще записей: {count}",
+    },
+}
+
+
+@dataclass
+class RenderedReport:
+    text: str
+    html: str
+    # Content-ID -> PNG bytes for images referenced from the HTML.
+    images: Dict[str, bytes] = field(default_factory=dict)
+
+
+def bar_chart(model: ReportModel, width: int = 560, row_height: int = 22) -> Optional[bytes]:
+    if Image is None or not model.apps:
+        return None
+    apps = model.apps[:CHART_TOP_APPS]
+    height = row_height * len(apps) + 8
+    image = Image.new("RGB", (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    label_width = 220
+    peak = apps[0][1] or 1.0
+    for i, (app, seconds) in enumerate(apps):
+        top = 4 + i * row_height
+        draw.text((4, top + 4), app[:32], fill=(40, 40, 40))
+        bar = int((width - label_width - 8) * seconds / peak)
+        draw.rectangle((label_width, top + 3, label_width + max(bar, 1), top + row_height - 3), fill=BAR_COLOR)
+    return _png(image)
+
+
+def timeline_chart(model: ReportModel, width: int = 560, height: int = 120) -> Optional[bytes]:
+    if Image is None or not model.hours:
+        return None
+    image = Image.new("RGB", (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    plot_height = height - 18
+    column = width / 24
+    for hour, seconds in enumerate(model.hours):
+        left = int(hour * column) + 1
+        bar = int(plot_height * min(seconds, 3600.0) / 3600.0)
+        if bar:
+            draw.rectangle((left, plot_height - bar, int(left + column) - 2, plot_height), fill=BAR_COLOR)
+        if hour % 3 == 0:
+            draw.text((left, plot_height + 4), f"{hour:02d}", fill=(80, 80, 80))
+    draw.line((0, plot_height, width, plot_height), fill=(160, 160, 160))
+    return _png(image)
+
+
+def _png(image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", optimize=False)
+    return buffer.getvalue()
+
+
+def _duration(seconds: float, lang: str) -> str:
+    h, m = seconds_to_hours_minutes(seconds)
+    return f"{h}ч {m}м" if lang == "ru" else f"{h}h {m}m"
+
+
+def render_html(model: ReportModel, language: str, images: Dict[str, bytes]) -> str:
+    lang = (language or "en").lower()
+    langs = [lang] if lang in LABELS else ["ru", "en"]
+    sections = []
+    for code in langs:
+        labels = LABELS[code]
+        period = model.day.isoformat() if not model.end_day else f"{model.day.isoformat()} – {model.end_day.isoformat()}"
+        parts = [
+            f"<h2>{labels['title']} {period}</h2>",
+            f"<p><b>{labels['total']}:</b> {_duration(model.active_seconds, code)}</p>",
+        ]
+        if "timeline" in images:
+            parts.append(f"<h3>{labels['hours']}</h3><img src=\"cid:timeline\" alt=\"{labels['hours']}\">")
+        parts.append(f"<h3>{labels['apps']}</h3>")
+        if "apps" in images:
+            parts.append(f"<img src=\"cid:apps\" alt=\"{labels['apps']}\">")
+        rows = "".join(
+            f"<tr><td>{html.escape(app)}</td><td>{_duration(seconds, code)}</td></tr>"
+            for app, seconds in model.apps[:HTML_MAX_ROWS]
+        )
+        parts.append(f"<table><tr><th>{labels['app']}</th><th>{labels['time']}</th></tr>{rows}</table>")
+        if len(model.apps) > HTML_MAX_ROWS:
+            parts.append(f"<p>{labels['more'].format(count=len(model.apps) - HTML_MAX_ROWS)}</p>")
+        sections.append("".join(parts))
+    return "<html><body>" + "<hr>".join(sections) + "</body></html>"
+
+
+class ReportRenderer:
+    """Renders text + HTML reports with inline charts, caching by report content hash.
+
+    The model is built once per snapshot; re-rendering an unchanged day (for
+    example "Send report now" twice in a minute) reuses the cached output.
+    """
+
+    def __init__(self, cache_size: int = 8) -> None:
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[str, RenderedReport]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, snapshot: ActivitySnapshot, language: str) -> RenderedReport:
+        model = build_model(snapshot)
+        key = f"{(language or 'en').lower()}:{model.key}"
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+        images = {}
+        for cid, chart in (("apps", bar_chart), ("timeline", timeline_chart)):
+            data = chart(model)
+            if data:
+                images[cid] = data
+        report = RenderedReport(
+            text=format_report_localized(snapshot, language, model),
+            html=render_html(model, language, images),
+            images=images,
+        )
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = report
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return report
@@ -1,5 +1,8 @@
+import hashlib
+import time
+from dataclasses import dataclass
 from datetime import date, timedelta
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from .tracker import ActivitySnapshot
 
@@ -11,45 +14,113 @@ def seconds_to_hours_minutes(seconds: float) -> Tuple[int, int]:
     return hours, remaining_minutes
 
 
-def format_report(snapshot: ActivitySnapshot) -> str:
-    hours, minutes = seconds_to_hours_minutes(snapshot.active_seconds)
+@dataclass(frozen=True)
+class ReportModel:
+    """Sorted, aggregated view of a snapshot; built once and shared by every renderer."""
+
+    day: date
+    end_day: Optional[date]
+    active_seconds: float
+    apps: Tuple[Tuple[str, float], ...]
+    hours: Tuple[float, ...]
+
+    @property
+    def hourly(self) -> List[Tuple[int, float]]:
+        return [(hour, seconds) for hour, seconds in enumerate(self.hours) if seconds >= 60]
+
+    @property
+    def key(self) -> str:
+        """Hash of everything a report shows, at the minute resolution it shows it."""
+        digest = hashlib.sha1()
+        digest.update(f"{self.day}|{self.end_day}|{int(self.active_seconds // 60)}".encode("utf-8"))
+        for app, seconds in self.apps:
+            digest.update(f"|{app}={int(seconds // 60)}".encode("utf-8"))
+        for seconds in self.hours:
+            digest.update(f"|{int(seconds // 60)}".encode("utf-8"))
+        return digest.hexdigest()
+
+
+def build_model(snapshot: ActivitySnapshot) -> ReportModel:
+    per_app = snapshot.per_app_seconds or {}
+    apps = tuple(sorted(per_app.items(), key=lambda item: item[1], reverse=True))
+    hours: Tuple[float, ...] = ()
+    if snapshot.timeline is not None and len(snapshot.timeline):
+        day_start = time.mktime(snapshot.day.timetuple())
+        hours = tuple(snapshot.timeline.hourly_seconds(day_start))
+    return ReportModel(snapshot.day, snapshot.end_day, snapshot.active_seconds, apps, hours)
+
+
+def hourly_breakdown(snapshot: ActivitySnapshot) -> List[Tuple[int, float]]:
+    """(hour, active seconds) pairs for hours with any activity, from the snapshot timeline."""
+    return build_model(snapshot).hourly
+
+
+def format_report(snapshot: ActivitySnapshot, model: Optional[ReportModel] = None) -> str:
+    model = model or build_model(snapshot)
+    hours, minutes = seconds_to_hours_minutes(model.active_seconds)
     lines = []
-    lines.append(f"За сегодня, {snapshot.day.isoformat()}, общее активное время: {hours} часов {minutes} минут.")
+    if model.end_day:
+        lines.append(
+            f"За период {model.day.isoformat()} — {model.end_day.isoformat()} "
+            f"общее активное время: {hours} часов {minutes} минут."
+        )
+    else:
+        lines.append(f"За сегодня, {model.day.isoformat()}, общее активное время: {hours} часов {minutes} минут.")
     lines.append("")
     lines.append("По приложениям:")
-    per_app = snapshot.per_app_seconds or {}
-    if per_app:
-        for app, seconds in sorted(per_app.items(), key=lambda item: item[1], reverse=True):
+    if model.apps:
+        for app, seconds in model.apps:
             h, m = seconds_to_hours_minutes(seconds)
             lines.append(f"- {app}: {h}ч {m}м")
     else:
         lines.append("- Нет данных")
+    hourly = model.hourly
+    if hourly:
+        lines.append("")
+        lines.append("По часам:")
+        for hour, seconds in hourly:
+            lines.append(f"- {hour:02d}:00–{(hour + 1) % 24:02d}:00: {int(seconds // 60)}м")
     return "\n".join(lines)
 
 
-def format_report_en(snapshot: ActivitySnapshot) -> str:
-    hours, minutes = seconds_to_hours_minutes(snapshot.active_seconds)
+def format_report_en(snapshot: ActivitySnapshot, model: Optional[ReportModel] = None) -> str:
+    model = model or build_model(snapshot)
+    hours, minutes = seconds_to_hours_minutes(model.active_seconds)
     lines = []
-    lines.append(f"Today ({snapshot.day.isoformat()}) active time: {hours} hours {minutes} minutes.")
+    if model.end_day:
+        lines.append(
+            f"Period {model.day.isoformat()} – {model.end_day.isoformat()} "
+            f"active time: {hours} hours {minutes} minutes."
+        )
+    else:
+        lines.append(f"Today ({model.day.isoformat()}) active time: {hours} hours {minutes} minutes.")
     lines.append("")
     lines.append("Per application:")
-    per_app = snapshot.per_app_seconds or {}
-    if per_app:
-        for app, seconds in sorted(per_app.items(), key=lambda item: item[1], reverse=True):
+    if model.apps:
+        for app, seconds in model.apps:
             h, m = seconds_to_hours_minutes(seconds)
             lines.append(f"- {app}: {h}h {m}m")
     else:
         lines.append("- No data")
+    hourly = model.hourly
+    if hourly:
+        lines.append("")
+        lines.append("By hour:")
+        for hour, seconds in hourly:
+            lines.append(f"- {hour:02d}:00–{(hour + 1) % 24:02d}:00: {int(seconds // 60)}m")
     return "\n".join(lines)
 
 
-def format_report_localized(snapshot: ActivitySnapshot, language: str) -> str:
+def format_report_localized(
+    snapshot: ActivitySnapshot, language: str, model: Optional[ReportModel] = None
+) -> str:
+    model = model or build_model(snapshot)
     lang = (language or "en").lower()
     if lang == "ru":
-        return format_report(snapshot)
+        return format_report(snapshot, model)
     if lang == "en":
-        return format_report_en(snapshot)
+        return format_report_en(snapshot, model)
     # Default to bilingual if unknown or "both"
-    ru_body = format_report(snapshot)
-    en_body = format_report_en(snapshot)
+    ru_body = format_report(snapshot, model)
+    en_body = format_report_en(snapshot, model)
     return f"{ru_body}\n\n----\nEnglish version:\n{en_body}"
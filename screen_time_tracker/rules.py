@@ -0,0 +1,327 @@
+"""Event-driven limit rules fed by tracker deltas.
+
+The engine subscribes to :meth:`ActivityTracker.subscribe` and, for every
+credited delta, touches only the rules that match the delta's executable
+(plus the rules that match every app), so a tick costs O(matching rules)
+however many rules exist. Each budget rule keeps its next crossing as a
+usage threshold; the delta that passes it fires the rule, and the crossing
+time is interpolated inside the delta, so it is exact to the second even
+though detection happens on the tick.
+
+Rules file (JSON, ``TRACKER_RULES_FILE``)::
+
+    {
+      "categories": {"games": ["steam.exe", "minecraft.exe"]},
+      "rules": [
+        {"name": "games", "type": "budget", "category": "games", "minutes": 60},
+        {"name": "no games at night", "type": "window", "category": "games", "start": "21:00", "end": "07:00"},
+        {"name": "browser", "type": "budget", "apps": ["chrome.exe"], "minutes": 90},
+        {"name": "sitting", "type": "session", "minutes": 45, "gap_minutes": 5}
+      ]
+    }
+
+A rule without ``apps`` or ``category`` applies to all activity.
+"""
+
+import json
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional
+
+from .appstats import exe_of
+
+logger = logging.getLogger(__name__)
+
+BUDGET = "budget"
+WINDOW = "window"
+SESSION = "session"
+
+
+def _parse_hhmm(value: str) -> int:
+    hours, minutes = str(value).split(":")
+    result = int(hours) * 60 + int(minutes)
+    if not 0 <= result < 24 * 60:
+        raise ValueError(f"Invalid time of day: {value}")
+    return result
+
+
+class Rule:
+    """Base rule; ``exes`` is the set of lower-case executables it watches, ``None`` for all."""
+
+    __slots__ = ("name", "exes", "key")
+    kind = ""
+
+    def __init__(self, name: str, exes: Optional[Iterable[str]] = None, key: Optional[str] = None) -> None:
+        self.name = name
+        self.exes: Optional[FrozenSet[str]] = frozenset(exe.lower() for exe in exes) if exes is not None else None
+        # Notification key; built-in limits reuse the keys the notifier knows how to supersede.
+        self.key = key or f"rule:{name}"
+
+    def signature(self) -> tuple:
+        """Identity of the rule's settings; a reloaded rule with the same signature inherits today's state."""
+        return (self.kind, self.key, self.exes)
+
+    def carry(self, old: "Rule") -> None:
+        """Take over ``old``'s state for today (what has fired, open sessions)."""
+
+    def reset(self) -> None:
+        pass
+
+    def seed(self, seconds: float) -> None:
+        pass
+
+    def feed(self, start: float, end: float, seconds: float) -> Optional[float]:
+        """Account one delta; returns the crossing timestamp if the rule fires."""
+        raise NotImplementedError
+
+
+class BudgetRule(Rule):
+    """Fires when today's matching usage reaches ``limit`` seconds, then every ``repeat`` seconds if set."""
+
+    __slots__ = ("limit", "repeat", "used", "threshold")
+    kind = BUDGET
+
+    def __init__(self, name: str, limit: float, exes=None, repeat: float = 0.0, key: Optional[str] = None) -> None:
+        super().__init__(name, exes, key)
+        self.limit = limit
+        self.repeat = repeat
+        self.reset()
+
+    def signature(self) -> tuple:
+        return super().signature() + (self.limit, self.repeat)
+
+    def carry(self, old: "Rule") -> None:
+        self.threshold = max(self.threshold, old.threshold)
+
+    def reset(self) -> None:
+        self.used = 0.0
+        self.threshold = self.limit
+
+    def seed(self, seconds: float) -> None:
+        self.used = seconds
+        if self.repeat:
+            # Periodic reminders already due are skipped rather than fired in a burst.
+            while self.threshold <= self.used:
+                self.threshold += self.repeat
+
+    def feed(self, start: float, end: float, seconds: float) -> Optional[float]:
+        before = self.used
+        self.used += seconds
+        if self.used < self.threshold:
+            return None
+        at = min(start + max(self.threshold - before, 0.0), end)
+        if self.repeat:
+            while self.threshold <= self.used:
+                self.threshold += self.repeat
+        else:
+            self.threshold = float("inf")
+        return at
+
+
+class WindowRule(Rule):
+    """Fires once per occurrence of a time-of-day window (``end`` may be past midnight) when matching apps are used."""
+
+    __slots__ = ("start", "end", "fired_on")
+    kind = WINDOW
+
+    def __init__(self, name: str, start: str, end: str, exes=None, key: Optional[str] = None) -> None:
+        super().__init__(name, exes, key)
+        self.start = _parse_hhmm(start)
+        self.end = _parse_hhmm(end)
+        self.fired_on: Optional[date] = None
+
+    def signature(self) -> tuple:
+        return super().signature() + (self.start, self.end)
+
+    def carry(self, old: "Rule") -> None:
+        self.fired_on = old.fired_on
+
+    def _occurrence(self, moment: datetime) -> Optional[date]:
+        """Date the window opened on if ``moment`` lies inside it."""
+        minute = moment.hour * 60 + moment.minute
+        if self.start <= self.end:
+            return moment.date() if self.start <= minute < self.end else None
+        if minute >= self.start:
+            return moment.date()
+        if minute < self.end:
+            return moment.date() - timedelta(days=1)
+        return None
+
+    def feed(self, start: float, end: float, seconds: float) -> Optional[float]:
+        began = datetime.fromtimestamp(start)
+        occurrence = self._occurrence(began)
+        at = start
+        if occurrence is None:
+            # The window may open during this delta.
+            ended = datetime.fromtimestamp(end)
+            occurrence = self._occurrence(ended)
+            if occurrence is None:
+                return None
+            at = datetime.combine(occurrence, datetime.min.time()).timestamp() + self.start * 60
+        if occurrence == self.fired_on:
+            return None
+        self.fired_on = occurrence
+        return at
+
+
+class SessionRule(Rule):
+    """Fires when matching use continues ``limit`` seconds with no pause longer than ``gap``."""
+
+    __slots__ = ("limit", "gap", "session_start", "last_end", "fired")
+    kind = SESSION
+
+    def __init__(self, name: str, limit: float, gap: float = 300.0, exes=None, key: Optional[str] = None) -> None:
+        super().__init__(name, exes, key)
+        self.limit = limit
+        self.gap = gap
+        self.reset()
+
+    def signature(self) -> tuple:
+        return super().signature() + (self.limit, self.gap)
+
+    def carry(self, old: "Rule") -> None:
+        self.session_start, self.last_end, self.fired = old.session_start, old.last_end, old.fired
+
+    def reset(self) -> None:
+        self.session_start: Optional[float] = None
+        self.last_end: Optional[float] = None
+        self.fired = False
+
+    def feed(self, start: float, end: float, seconds: float) -> Optional[float]:
+        if self.last_end is None or start - self.last_end > self.gap:
+            self.session_start = start
+            self.fired = False
+        self.last_end = end
+        if self.fired or end - self.session_start < self.limit:
+            return None
+        self.fired = True
+        return self.session_start + self.limit
+
+
+def load_rules(path: Path) -> List[Rule]:
+    """Parse a rules file; a missing file means no custom rules, a malformed one raises ``ValueError``."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return []
+    except OSError as exc:
+        raise ValueError(f"Cannot read rules file {path}: {exc}") from exc
+    if not isinstance(data, dict):
+        raise ValueError(f"Rules file {path} must contain a JSON object")
+    categories = {name: list(exes) for name, exes in data.get("categories", {}).items()}
+    rules: List[Rule] = []
+    for entry in data.get("rules", []):
+        try:
+            name = str(entry["name"])
+            kind = entry.get("type", BUDGET)
+            exes = entry.get("apps")
+            if "category" in entry:
+                exes = categories[entry["category"]]
+            if kind == BUDGET:
+                rules.append(
+                    BudgetRule(name, float(entry["minutes"]) * 60, exes, float(entry.get("repeat_minutes", 0)) * 60)
+                )
+            elif kind == WINDOW:
+                rules.append(WindowRule(name, entry["start"], entry["end"], exes))
+            elif kind == SESSION:
+                rules.append(SessionRule(name, float(entry["minutes"]) * 60, float(entry.get("gap_minutes", 5)) * 60, exes))
+            else:
+                raise ValueError(f"unknown type {kind}")
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError(f"Invalid rule {entry!r}: {exc}") from exc
+    return rules
+
+
+class RuleEngine:
+    """Routes tracker deltas to the rules they can affect and reports crossings via ``on_fire(rule, at)``."""
+
+    def __init__(self, on_fire: Callable[[Rule, float], None]) -> None:
+        self.on_fire = on_fire
+        self.lock = threading.Lock()
+        self.day: Optional[str] = None
+        self.rules: List[Rule] = []
+        # Rules replaced by the last set_rules, whose state seed() carries over.
+        self._replaced: List[Rule] = []
+        self._seeded = False
+        self._global: List[Rule] = []
+        self._by_exe: Dict[str, List[Rule]] = {}
+
+    def set_rules(self, rules: List[Rule]) -> None:
+        by_exe: Dict[str, List[Rule]] = {}
+        for rule in rules:
+            for exe in rule.exes or ():
+                by_exe.setdefault(exe, []).append(rule)
+        with self.lock:
+            self._replaced = self.rules
+            self.rules = list(rules)
+            self._global = [rule for rule in rules if rule.exes is None]
+            self._by_exe = by_exe
+
+    def seed(self, day: str, active_seconds: float, per_exe_seconds: Dict[str, float], now: float) -> None:
+        """Start from today's totals (after a restart or a rule change).
+
+        Budgets already crossed fire now only on the first seed after start;
+        on a reload they are marked as fired, and rules whose settings did not
+        change keep today's state, so editing the rules never repeats a
+        notification the child has already seen.
+        """
+        per_exe: Dict[str, float] = {}
+        for exe, seconds in per_exe_seconds.items():
+            per_exe[exe.lower()] = per_exe.get(exe.lower(), 0.0) + seconds
+        fired = []
+        with self.lock:
+            previous = {rule.signature(): rule for rule in self._replaced} if day == self.day else {}
+            first = not self._seeded
+            self._seeded = True
+            self._replaced = []
+            self.day = day
+            for rule in self.rules:
+                rule.reset()
+                if rule.kind == BUDGET:
+                    rule.seed(active_seconds if rule.exes is None else sum(per_exe.get(exe, 0.0) for exe in rule.exes))
+                old = previous.get(rule.signature())
+                if old is not None:
+                    rule.carry(old)
+                if rule.kind != BUDGET:
+                    continue
+                at = rule.feed(now, now, 0.0)
+                if at is not None and first:
+                    fired.append((rule, at))
+        self._fire(fired)
+
+    def on_delta(self, day: str, app: str, seconds: float, start: float, end: float) -> None:
+        fired = []
+        with self.lock:
+            if day != self.day:
+                self.day = day
+                for rule in self.rules:
+                    rule.reset()
+            for rules in (self._global, self._by_exe.get(exe_of(app).lower(), ())):
+                for rule in rules:
+                    at = rule.feed(start, end, seconds)
+                    if at is not None:
+                        fired.append((rule, at))
+        self._fire(fired)
+
+    def observe_total(self, day: str, seconds: float, now: float) -> None:
+        """Raise all-app budgets to an externally known total (e.g. household-wide usage)."""
+        fired = []
+        with self.lock:
+            if day != self.day:
+                return
+            for rule in self._global:
+                if rule.kind == BUDGET and seconds > rule.used:
+                    at = rule.feed(now, now, seconds - rule.used)
+                    if at is not None:
+                        fired.append((rule, at))
+        self._fire(fired)
+
+    def _fire(self, fired) -> None:
+        for rule, at in fired:
+            try:
+                self.on_fire(rule, at)
+            except Exception:
+                # One failing action must not stop the others or the tick that fired them.
+                logger.exception("Rule %r action failed", rule.name)
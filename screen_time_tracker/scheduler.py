@@ -1,31 +1,223 @@
+import heapq
+import itertools
 import threading
-import time
-from typing import Callable
+from concurrent.futures import Executor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
 
-import schedule
+from . import metrics
+from .clock import SystemClock
+
+# Catch-up policies for occurrences missed while the machine slept or the clock jumped.
+CATCH_UP_ONCE = "once"  # run one time, keep the original grid
+CATCH_UP_SKIP = "skip"  # drop the missed occurrence
+CATCH_UP_COALESCE = "coalesce"  # run one time and re-anchor the interval on "now"
+CATCH_UP_POLICIES = (CATCH_UP_ONCE, CATCH_UP_SKIP, CATCH_UP_COALESCE)
+
+# An occurrence later than this counts as missed rather than merely late.
+MISSED_GRACE_SECONDS = 120.0
+# Wall and monotonic clocks disagreeing by more than this means sleep/hibernate or a clock change.
+CLOCK_JUMP_SECONDS = 5.0
+# Upper bound on a single wait so a suspended monotonic clock cannot hide a jump for long.
+MAX_SLEEP_SECONDS = 60.0
+
+
+class Job:
+    def __init__(self, func: Callable, catch_up: str, interval: Optional[float] = None, at: Optional[str] = None):
+        if catch_up not in CATCH_UP_POLICIES:
+            raise ValueError(f"Unknown catch-up policy: {catch_up}")
+        self.func = func
+        self.catch_up = catch_up
+        self.interval = interval
+        self.at: Optional[Tuple[int, int]] = None
+        if at is not None:
+            hours, minutes = at.split(":")
+            self.at = (int(hours), int(minutes))
+        self.next_run = 0.0
+        self.running = False
+        self.cancelled = False
+        self.runs = 0
+        self.missed = 0
+        self.overlaps = 0
+        self.last_lag = 0.0
+        # Deadline of the run in progress (or the last one); catch-up runs can see which one they missed.
+        self.last_due = 0.0
+        self.last_duration = 0.0
+        self.lag_metric = metrics.registry.histogram(
+            "scheduler_job_lag_seconds", "Delay between a job's deadline and its dispatch", {"job": self.name}
+        )
+        self.duration_metric = metrics.registry.histogram(
+            "scheduler_job_seconds", "Job run time", {"job": self.name}
+        )
+
+    @property
+    def name(self) -> str:
+        return getattr(self.func, "__name__", repr(self.func))
+
+    def next_after(self, after: float) -> float:
+        if self.interval is not None:
+            return after + self.interval
+        hour, minute = self.at
+        moment = datetime.fromtimestamp(after).replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if moment.timestamp() <= after:
+            moment += timedelta(days=1)
+        return moment.timestamp()
+
+    def period(self) -> float:
+        return self.interval if self.interval is not None else 86400.0
 
 
 class Scheduler:
-    def __init__(self) -> None:
+    """Min-heap of job deadlines; sleeps exactly until the next one is due.
+
+    Jobs run on a small worker pool so a slow job (SMTP) never delays the
+    others; a job whose previous run is still in progress skips that
+    occurrence. Occurrences later than ``MISSED_GRACE_SECONDS`` are handled by
+    the job's catch-up policy. The clock and executor are injectable, and
+    :meth:`run_pending` can be driven directly for deterministic tests.
+    """
+
+    def __init__(self, clock=None, executor: Optional[Executor] = None, workers: int = 3) -> None:
         self.running = False
+        self.clock = clock or SystemClock()
+        self.executor = executor or ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scheduler")
+        self.jobs: List[Job] = []
+        self.clock_jumps = 0
+        self._heap: List[Tuple[float, int, Job]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._last_wall = self.clock.time()
+        self._last_mono = self.clock.monotonic()
+
+    def every_day_at(self, hhmm: str, job: Callable, catch_up: str = CATCH_UP_ONCE) -> Job:
+        return self._add(Job(job, catch_up, at=hhmm))
 
-    def every_day_at(self, hhmm: str, job: Callable) -> None:
-        schedule.every().day.at(hhmm).do(job)
+    def every_hour(self, job: Callable, catch_up: str = CATCH_UP_COALESCE) -> Job:
+        return self.every_minutes(60, job, catch_up)
 
-    def every_hour(self, job: Callable) -> None:
-        schedule.every().hour.do(job)
+    def every_minutes(self, minutes: int, job: Callable, catch_up: str = CATCH_UP_COALESCE) -> Job:
+        return self.every_seconds(minutes * 60.0, job, catch_up)
 
-    def every_minutes(self, minutes: int, job: Callable) -> None:
-        schedule.every(minutes).minutes.do(job)
+    def every_seconds(self, seconds: float, job: Callable, catch_up: str = CATCH_UP_COALESCE) -> Job:
+        return self._add(Job(job, catch_up, interval=float(seconds)))
+
+    def _add(self, job: Job) -> Job:
+        with self._cond:
+            job.next_run = job.next_after(self.clock.time())
+            self.jobs.append(job)
+            self._push(job)
+            self._cond.notify()
+        return job
+
+    def _push(self, job: Job) -> None:
+        heapq.heappush(self._heap, (job.next_run, next(self._seq), job))
 
     def start(self) -> None:
         self.running = True
         threading.Thread(target=self._loop, daemon=True).start()
 
     def stop(self) -> None:
-        self.running = False
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        self.executor.shutdown(wait=False)
+
+    def seconds_until_next(self) -> Optional[float]:
+        with self._cond:
+            self._drop_stale()
+            if not self._heap:
+                return None
+            return max(self._heap[0][0] - self.clock.time(), 0.0)
 
     def _loop(self) -> None:
-        while self.running:
-            schedule.run_pending()
-            time.sleep(30)
+        with self._cond:
+            while self.running:
+                self._check_clock_jump()
+                self._run_due()
+                self._drop_stale()
+                timeout = MAX_SLEEP_SECONDS
+                if self._heap:
+                    timeout = min(max(self._heap[0][0] - self.clock.time(), 0.0), MAX_SLEEP_SECONDS)
+                self._cond.wait(timeout)
+
+    def run_pending(self) -> None:
+        with self._cond:
+            self._check_clock_jump()
+            self._run_due()
+
+    def _drop_stale(self) -> None:
+        while self._heap and (self._heap[0][2].cancelled or self._heap[0][0] != self._heap[0][2].next_run):
+            heapq.heappop(self._heap)
+
+    def _check_clock_jump(self) -> None:
+        wall, mono = self.clock.time(), self.clock.monotonic()
+        drift = (wall - self._last_wall) - (mono - self._last_mono)
+        self._last_wall, self._last_mono = wall, mono
+        if abs(drift) <= CLOCK_JUMP_SECONDS:
+            return
+        self.clock_jumps += 1
+        if drift < 0:
+            # Clock went backwards: deadlines computed before the jump are now too far away.
+            for job in self.jobs:
+                if not job.cancelled and job.next_run - wall > job.period():
+                    job.next_run = job.next_after(wall)
+                    self._push(job)
+        # Forward jumps need no rescheduling: overdue jobs are caught up by _run_due.
+
+    def _run_due(self) -> None:
+        now = self.clock.time()
+        while self._heap and self._heap[0][0] <= now:
+            due, _, job = heapq.heappop(self._heap)
+            if job.cancelled or due != job.next_run:
+                continue
+            lag = now - due
+            run = True
+            if lag > MISSED_GRACE_SECONDS:
+                job.missed += 1
+                run = job.catch_up != CATCH_UP_SKIP
+                if job.catch_up == CATCH_UP_COALESCE:
+                    job.next_run = job.next_after(now)
+                else:
+                    job.next_run = job.next_after(due)
+                    while job.next_run <= now:
+                        job.next_run = job.next_after(job.next_run)
+            else:
+                job.next_run = job.next_after(due)
+                if job.next_run <= now:
+                    job.next_run = job.next_after(now)
+            self._push(job)
+            if run:
+                self._dispatch(job, due, lag)
+
+    def _dispatch(self, job: Job, due: float, lag: float) -> None:
+        if job.running:
+            job.overlaps += 1
+            return
+        job.running = True
+        job.last_due = due
+        job.last_lag = lag
+        job.lag_metric.observe(lag)
+        try:
+            self.executor.submit(self._run_job, job)
+        except RuntimeError:
+            # Executor already shut down.
+            job.running = False
+
+    def _run_job(self, job: Job) -> None:
+        started = self.clock.monotonic()
+        try:
+            job.func()
+        except Exception:
+            pass
+        finally:
+            job.runs += 1
+            job.last_duration = self.clock.monotonic() - started
+            job.duration_metric.observe(job.last_duration)
+            job.running = False
+
+    def cancel(self, job: Job) -> None:
+        with self._cond:
+            job.cancelled = True
+            if job in self.jobs:
+                self.jobs.remove(job)
+            self._cond.notify()
@@ -0,0 +1,278 @@
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    from PIL import Image
+except Exception:  # pragma: no cover - optional
+    Image = None
+
+DAY_DIR_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp"}
+CONTACT_SHEET = "contact-sheet.jpg"
+FRAMES_LOG = "frames.jsonl"
+
+# Serialises appends to a day's frames log with the store rewriting it, so a
+# reference is never written to a file that is being deleted.
+_frames_lock = threading.Lock()
+
+
+def append_frame(day_dir: Path, record: Dict, needs: Optional[Path] = None) -> bool:
+    """Append ``record`` to the day's frames log; False (nothing written) if ``needs`` is gone."""
+    with _frames_lock:
+        if needs is not None and not needs.exists():
+            return False
+        with open(day_dir / FRAMES_LOG, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(record) + "\n")
+        return True
+
+
+def _drop_frames(day_dir: Path, names: List[str], moved: Dict[str, Dict]) -> None:
+    """Delete ``names`` and point the frames log at ``moved[name]`` (or mark it evicted) instead.
+
+    Caller holds ``_frames_lock``.
+    """
+    for name in names:
+        try:
+            (day_dir / name).unlink()
+        except OSError:
+            pass
+    path = day_dir / FRAMES_LOG
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return
+    gone = set(names)
+    out = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        target = record.get("file") or record.get("ref") or ""
+        name = target.rsplit("/", 1)[-1]
+        if name in gone:
+            del record["file" if "file" in record else "ref"]
+            record.update(moved.get(name, {"evicted": True}))
+        out.append(json.dumps(record))
+    tmp = path.with_suffix(".jsonl.tmp")
+    try:
+        tmp.write_text("".join(line + "\n" for line in out), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+class ScreenshotStore:
+    """Quota, retention and compaction for ``screenshot_dir/YYYY-MM-DD/`` folders.
+
+    ``index.json`` in the screenshot root lists every stored file and its size,
+    so listing and eviction never walk the tree (a walk happens only once, to
+    bootstrap a missing index). Days older than ``compact_after_days`` are
+    folded into a single downscaled contact sheet by :meth:`compact_step`,
+    which does a bounded amount of work per call. A zero quota, retention or
+    compaction age disables that policy.
+
+    A day's ``frames.jsonl`` (see :class:`~screen_time_tracker.screenshots.ScreenshotPipeline`)
+    only references files of the same day. Compaction rewrites those
+    references to ``{"sheet", "tile"}``; frames trimmed for the quota become
+    ``{"evicted": true}``.
+    """
+
+    def __init__(
+        self,
+        base_dir: Path,
+        quota_bytes: int = 0,
+        retention_days: int = 0,
+        compact_after_days: int = 0,
+        thumb_width: int = 320,
+    ) -> None:
+        self.base_dir = base_dir
+        self.index_path = base_dir / "index.json"
+        self.quota_bytes = quota_bytes
+        self.retention_days = retention_days
+        self.compact_after_days = compact_after_days
+        self.thumb_width = thumb_width
+        self.days: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+        self._compaction: Optional[Dict] = None
+        self._load()
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(day["bytes"] for day in self.days.values())
+
+    def _load(self) -> None:
+        try:
+            self.days = json.loads(self.index_path.read_text(encoding="utf-8"))["days"]
+        except (OSError, ValueError, KeyError):
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        self.days = {}
+        if not self.base_dir.exists():
+            return
+        for entry in os.scandir(self.base_dir):
+            if not entry.is_dir() or not DAY_DIR_RE.match(entry.name):
+                continue
+            files = {}
+            for item in os.scandir(entry.path):
+                if Path(item.name).suffix.lower() in IMAGE_SUFFIXES:
+                    files[item.name] = item.stat().st_size
+            self.days[entry.name] = {
+                "files": files,
+                "bytes": sum(files.values()),
+                "compacted": CONTACT_SHEET in files,
+            }
+        self._save()
+
+    def _save(self) -> None:
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".json.tmp")
+        try:
+            tmp.write_text(json.dumps({"days": self.days}, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, self.index_path)
+        except OSError:
+            pass
+
+    def add(self, path: Path) -> None:
+        """Register a freshly written screenshot and enforce the quota."""
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return
+        with self.lock:
+            day = self.days.setdefault(path.parent.name, {"files": {}, "bytes": 0, "compacted": False})
+            day["bytes"] += size - day["files"].get(path.name, 0)
+            day["files"][path.name] = size
+            self._evict(date.today())
+            self._save()
+
+    def evict(self, today: Optional[date] = None) -> int:
+        with self.lock:
+            removed = self._evict(today or date.today())
+            if removed:
+                self._save()
+            return removed
+
+    def _evict(self, today: date) -> int:
+        removed = 0
+        if self.retention_days > 0:
+            cutoff = (today - timedelta(days=self.retention_days)).isoformat()
+            for day in sorted(self.days):
+                if day >= cutoff:
+                    break
+                removed += self._remove_day(day)
+        if self.quota_bytes > 0:
+            for day in sorted(self.days):
+                if self.total_bytes <= self.quota_bytes:
+                    break
+                if day == today.isoformat():
+                    removed += self._trim_day(day)
+                else:
+                    removed += self._remove_day(day)
+        return removed
+
+    def _remove_day(self, day: str) -> int:
+        entry = self.days.pop(day)
+        if self._compaction and self._compaction["day"] == day:
+            self._compaction = None
+        shutil.rmtree(self.base_dir / day, ignore_errors=True)
+        return len(entry["files"])
+
+    def _trim_day(self, day: str) -> int:
+        # Quota smaller than a single day: drop today's oldest frames.
+        entry = self.days[day]
+        dropped = []
+        for name in sorted(entry["files"]):
+            if self.total_bytes <= self.quota_bytes:
+                break
+            entry["bytes"] -= entry["files"].pop(name)
+            dropped.append(name)
+        if dropped:
+            with _frames_lock:
+                _drop_frames(self.base_dir / day, dropped, {})
+        return len(dropped)
+
+    def compact_step(self, budget_seconds: float = 0.5, today: Optional[date] = None) -> bool:
+        """Advance compaction by at most ``budget_seconds``; returns True while work remains.
+
+        Images are decoded without holding the store lock, so captures and
+        eviction only ever wait for one index update.
+        """
+        if self.compact_after_days <= 0 or Image is None:
+            return False
+        today = today or date.today()
+        deadline = time.monotonic() + budget_seconds
+        while True:
+            with self.lock:
+                if self._compaction is None:
+                    self._compaction = self._next_compaction(today)
+                    if self._compaction is None:
+                        return False
+                job = self._compaction
+                if not job["remaining"]:
+                    self._finish_compaction(job)
+                    self._compaction = None
+                    self._save()
+                    return self._next_compaction(today, peek=True) is not None
+                name = job["remaining"].pop()
+            try:
+                with Image.open(self.base_dir / job["day"] / name) as image:
+                    image.thumbnail((self.thumb_width, self.thumb_width))
+                    thumb = image.convert("RGB")
+            except OSError:
+                thumb = None
+            if thumb is not None:
+                with self.lock:
+                    # The day may have been evicted meanwhile.
+                    if self._compaction is job:
+                        job["thumbs"].append((name, thumb))
+            if time.monotonic() >= deadline:
+                return True
+
+    def _next_compaction(self, today: date, peek: bool = False) -> Optional[Dict]:
+        cutoff = (today - timedelta(days=self.compact_after_days)).isoformat()
+        for day in sorted(self.days):
+            if day >= cutoff:
+                break
+            entry = self.days[day]
+            if entry["compacted"] or not entry["files"]:
+                continue
+            if peek:
+                return entry
+            remaining = sorted((name for name in entry["files"] if name != CONTACT_SHEET), reverse=True)
+            return {"day": day, "remaining": remaining, "thumbs": []}
+        return None
+
+    def _finish_compaction(self, job: Dict) -> None:
+        day_dir = self.base_dir / job["day"]
+        entry = self.days.get(job["day"])
+        if entry is None:
+            return
+        thumbs: List = sorted(job["thumbs"], key=lambda item: item[0])
+        if thumbs:
+            columns = math.ceil(math.sqrt(len(thumbs)))
+            rows = math.ceil(len(thumbs) / columns)
+            cell_w = max(image.width for _, image in thumbs)
+            cell_h = max(image.height for _, image in thumbs)
+            sheet = Image.new("RGB", (columns * cell_w, rows * cell_h), (0, 0, 0))
+            for i, (_, image) in enumerate(thumbs):
+                sheet.paste(image, ((i % columns) * cell_w, (i // columns) * cell_h))
+            sheet.save(day_dir / CONTACT_SHEET, "JPEG", quality=70)
+        sheet_ref = f"{job['day']}/{CONTACT_SHEET}"
+        moved = {name: {"sheet": sheet_ref, "tile": i} for i, (name, _) in enumerate(thumbs)}
+        with _frames_lock:
+            # Only what made it into the sheet; unreadable images stay as they are.
+            _drop_frames(day_dir, list(moved), moved)
+        files = {name: size for name, size in entry["files"].items() if name not in moved and name != CONTACT_SHEET}
+        if (day_dir / CONTACT_SHEET).exists():
+            files[CONTACT_SHEET] = (day_dir / CONTACT_SHEET).stat().st_size
+        entry.update({"files": files, "bytes": sum(files.values()), "compacted": True})
@@ -1,20 +1,213 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from . import metrics
+from .screenshot_store import append_frame
 
 try:
     from PIL import ImageGrab
 except Exception:  # pragma: no cover - optional
     ImageGrab = None
 
+FORMATS: Dict[str, str] = {"png": "PNG", "jpeg": "JPEG", "jpg": "JPEG", "webp": "WEBP"}
+EXTENSIONS: Dict[str, str] = {"PNG": "png", "JPEG": "jpg", "WEBP": "webp"}
 
-def take_screenshot(base_dir: Path) -> Path:
+ENCODE_SECONDS = metrics.registry.histogram("screenshot_encode_seconds", "Screenshot encode time")
+ENCODED_BYTES = metrics.registry.histogram(
+    "screenshot_bytes", "Size of stored screenshots", buckets=metrics.SIZE_BUCKETS
+)
+
+
+def grab_screen():
     if not ImageGrab:
         raise RuntimeError("Pillow ImageGrab is not available on this platform.")
+    return ImageGrab.grab()
+
+
+def encode_image(image, path: Path, fmt: str = "png", quality: int = 80, max_width: int = 0) -> Path:
+    """Optionally downscale ``image`` and save it as ``fmt`` next to ``path`` (extension is replaced)."""
+    pil_format = FORMATS.get(fmt.lower())
+    if pil_format is None:
+        raise ValueError(f"Unsupported screenshot format: {fmt}")
+    if max_width and image.width > max_width:
+        height = max(1, round(image.height * max_width / image.width))
+        image = image.resize((max_width, height))
+    path = path.with_suffix("." + EXTENSIONS[pil_format])
+    if pil_format == "PNG":
+        image.save(path, pil_format, compress_level=6)
+    else:
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(path, pil_format, quality=quality)
+    return path
+
+
+def dhash(image, size: int = 8) -> int:
+    """Difference hash: compare neighbouring pixels of a tiny grayscale copy."""
+    small = image.convert("L").resize((size + 1, size))
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def take_screenshot(base_dir: Path) -> Path:
     now = datetime.now()
     day_dir = base_dir / now.strftime("%Y-%m-%d")
     day_dir.mkdir(parents=True, exist_ok=True)
-    filename = now.strftime("%H-%M-%S.png")
-    path = day_dir / filename
-    image = ImageGrab.grab()
-    image.save(path)
-    return path
+    path = day_dir / now.strftime("%H-%M-%S.png")
+    return encode_image(grab_screen(), path)
+
+
+class ScreenshotPipeline:
+    """Grab frames on the caller's thread and encode them on a bounded worker pool.
+
+    At most ``max_pending`` frames may be waiting for or in encoding; further
+    captures are skipped (before grabbing) and counted in ``dropped``.
+    ``source`` returns a Pillow image and can be replaced for headless testing.
+
+    Each frame's difference hash is compared with the last stored frame; when
+    the Hamming distance is at most ``dedup_distance`` only a metadata line
+    referencing the earlier file is appended to the day's ``frames.jsonl``.
+    References never cross midnight, and a frame whose earlier file has been
+    evicted meanwhile is stored again.
+    A negative ``dedup_distance`` disables deduplication. When ``idle_check``
+    returns True the capture is skipped entirely.
+    """
+
+    def __init__(
+        self,
+        base_dir: Path,
+        fmt: str = "png",
+        quality: int = 80,
+        max_width: int = 0,
+        workers: int = 1,
+        max_pending: int = 2,
+        source: Optional[Callable] = None,
+        on_saved: Optional[Callable[[Path], None]] = None,
+        dedup_distance: int = 4,
+        idle_check: Optional[Callable[[], bool]] = None,
+    ) -> None:
+        if fmt.lower() not in FORMATS:
+            raise ValueError(f"Unsupported screenshot format: {fmt}")
+        self.base_dir = base_dir
+        self.fmt = fmt
+        self.quality = quality
+        self.max_width = max_width
+        self.max_pending = max_pending
+        self.source = source or grab_screen
+        self.on_saved = on_saved
+        self.dedup_distance = dedup_distance
+        self.idle_check = idle_check
+        self.skipped_idle = 0
+        self.deduplicated = 0
+        self._last_hash: Optional[int] = None
+        self._last_file: Optional[str] = None
+        self.captured = 0
+        self.dropped = 0
+        self.saved = 0
+        self.failed = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="screenshot")
+
+    def capture(self, now: Optional[datetime] = None):
+        """Grab one frame and queue it for encoding; returns a Future, or None if skipped."""
+        if self.idle_check is not None and self.idle_check():
+            self.skipped_idle += 1
+            return None
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                return None
+            self._pending += 1
+        try:
+            image = self.source()
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+                self.failed += 1
+            raise
+        self.captured += 1
+        return self._pool.submit(self._encode, image, now or datetime.now())
+
+    def _encode(self, image, when: datetime) -> Optional[Path]:
+        try:
+            day_dir = self.base_dir / when.strftime("%Y-%m-%d")
+            day_dir.mkdir(parents=True, exist_ok=True)
+            frame_hash = dhash(image) if self.dedup_distance >= 0 else None
+            with self._lock:
+                previous = self._last_file
+                duplicate = (
+                    frame_hash is not None
+                    and previous is not None
+                    and previous.startswith(day_dir.name + "/")
+                    and hamming(frame_hash, self._last_hash) <= self.dedup_distance
+                )
+            if duplicate and append_frame(
+                day_dir, self._frame_record(when, frame_hash, ref=previous), needs=self.base_dir / previous
+            ):
+                self.deduplicated += 1
+                return None
+            stem = day_dir / when.strftime("%H-%M-%S")
+            ext = "." + EXTENSIONS[FORMATS[self.fmt.lower()]]
+            suffix = 1
+            while stem.with_suffix(ext).exists():
+                stem = day_dir / f"{when.strftime('%H-%M-%S')}-{suffix}"
+                suffix += 1
+            began = time.perf_counter()
+            path = encode_image(image, stem, self.fmt, self.quality, self.max_width)
+            ENCODE_SECONDS.observe(time.perf_counter() - began)
+            ENCODED_BYTES.observe(path.stat().st_size)
+            file_ref = f"{day_dir.name}/{path.name}"
+            with self._lock:
+                self._last_hash = frame_hash
+                self._last_file = file_ref
+            append_frame(day_dir, self._frame_record(when, frame_hash, file=file_ref))
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            return None
+        finally:
+            with self._lock:
+                self._pending -= 1
+        self.saved += 1
+        if self.on_saved:
+            try:
+                self.on_saved(path)
+            except Exception:
+                pass
+        return path
+
+    @staticmethod
+    def _frame_record(when: datetime, frame_hash: Optional[int], **fields) -> Dict:
+        return {
+            "time": when.isoformat(timespec="seconds"),
+            "hash": None if frame_hash is None else f"{frame_hash:016x}",
+            **fields,
+        }
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "skipped_idle": self.skipped_idle,
+            "deduplicated": self.deduplicated,
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "saved": self.saved,
+            "failed": self.failed,
+            "pending": self._pending,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
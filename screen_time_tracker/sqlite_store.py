@@ -0,0 +1,238 @@
+"""SQLite day store: one WAL-mode database with indexed per-day tables.
+
+Tables (all keyed by ``day`` first, so any date range is an index range scan):
+
+``days``       day, active_seconds, journal_seq
+``exes``       day, exe, seconds             (exact per-executable totals)
+``apps``       day, app, exe, seconds, error (per window title, bounded per day)
+``intervals``  day, seq, start_ts, end_ts, exe
+
+``exes`` and ``apps`` are also indexed by ``exe`` for per-app history.
+Every checkpoint is one transaction. The timeline only ever changes at its
+tail, so a checkpoint rewrites the last interval it wrote and appends the new
+ones instead of the whole day. WAL lets the report, export and API threads
+read while the tick thread writes; each thread gets its own connection.
+"""
+
+import sqlite3
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .appstats import exe_of, per_exe_totals
+from .storage import DayStore, JsonDayStore, _bounds
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS days (
+    day TEXT PRIMARY KEY,
+    active_seconds REAL NOT NULL,
+    journal_seq INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS exes (
+    day TEXT NOT NULL,
+    exe TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (day, exe)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS exes_by_exe ON exes (exe, day);
+CREATE TABLE IF NOT EXISTS apps (
+    day TEXT NOT NULL,
+    app TEXT NOT NULL,
+    exe TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    error REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, app)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS apps_by_exe ON apps (exe, day);
+CREATE TABLE IF NOT EXISTS intervals (
+    day TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    start_ts REAL NOT NULL,
+    end_ts REAL NOT NULL,
+    exe TEXT NOT NULL,
+    PRIMARY KEY (day, seq)
+) WITHOUT ROWID;
+"""
+
+MIGRATED_KEY = "json_migrated"
+
+
+class SqliteDayStore(DayStore):
+    indexed = True
+
+    def __init__(self, path: Path, readonly: bool = False) -> None:
+        self.path = path
+        self.readonly = readonly
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        # (count, first start) of each day's intervals already in the table, so checkpoints only write the tail.
+        self._written_intervals: Dict[str, Tuple[int, float]] = {}
+        if not readonly:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.readonly:
+                # Readers (export, the CLI) must not create the file or switch its journal mode.
+                uri = f"{self.path.resolve().as_uri()}?mode=ro"
+                conn = sqlite3.connect(uri, uri=True, timeout=10, check_same_thread=False)
+            else:
+                # Autocommit mode: transactions are opened explicitly with BEGIN.
+                conn = sqlite3.connect(str(self.path), timeout=10, isolation_level=None, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                # Each commit is a checkpoint after which the tracker truncates its journal, so it must
+                # reach the disk (NORMAL would defer that to the next WAL checkpoint). Commits are rare.
+                conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+    def write_day(self, data: Dict) -> bool:
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write(conn, data)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        except Exception:
+            # Best effort like JsonDayStore: a malformed day must not crash the tick thread.
+            self._written_intervals.pop(data["day"], None)
+            return False
+        return True
+
+    def _write(self, conn: sqlite3.Connection, data: Dict, full: bool = False) -> None:
+        day = data["day"]
+        conn.execute(
+            "INSERT OR REPLACE INTO days (day, active_seconds, journal_seq) VALUES (?, ?, ?)",
+            (day, float(data.get("active_seconds", 0.0)), int(data.get("journal_seq", 0))),
+        )
+        conn.execute("DELETE FROM exes WHERE day = ?", (day,))
+        conn.executemany(
+            "INSERT INTO exes (day, exe, seconds) VALUES (?, ?, ?)",
+            [(day, exe, seconds) for exe, seconds in per_exe_totals(data).items()],
+        )
+        errors = data.get("per_app_errors", {})
+        conn.execute("DELETE FROM apps WHERE day = ?", (day,))
+        conn.executemany(
+            "INSERT INTO apps (day, app, exe, seconds, error) VALUES (?, ?, ?, ?, ?)",
+            [(day, app, exe_of(app), seconds, errors.get(app, 0.0)) for app, seconds in data.get("per_app", {}).items()],
+        )
+        timeline = data.get("timeline") or {}
+        starts, ends, ids, names = (timeline.get(k, []) for k in ("start", "end", "app", "apps"))
+        written, first_start = self._written_intervals.get(day, (0, 0.0))
+        if full or written > len(starts) or (starts and starts[0] != first_start):
+            # Unknown or replaced timeline (restart, reset): rewrite the whole day.
+            written = 0
+        # The last interval written may have been extended since; rewrite from there.
+        first = max(written - 1, 0)
+        conn.execute("DELETE FROM intervals WHERE day = ? AND seq >= ?", (day, first))
+        conn.executemany(
+            "INSERT INTO intervals (day, seq, start_ts, end_ts, exe) VALUES (?, ?, ?, ?, ?)",
+            [(day, seq, starts[seq], ends[seq], names[ids[seq]]) for seq in range(first, len(starts))],
+        )
+        self._written_intervals[day] = (len(starts), starts[0] if starts else 0.0)
+
+    def read_day(self, day: str) -> Optional[Dict]:
+        conn = self._conn()
+        row = conn.execute("SELECT active_seconds, journal_seq FROM days WHERE day = ?", (day,)).fetchone()
+        if row is None:
+            return None
+        per_app: Dict[str, float] = {}
+        errors: Dict[str, float] = {}
+        for app, seconds, error in conn.execute("SELECT app, seconds, error FROM apps WHERE day = ?", (day,)):
+            per_app[app] = seconds
+            if error:
+                errors[app] = error
+        per_exe = dict(conn.execute("SELECT exe, seconds FROM exes WHERE day = ?", (day,)))
+        apps: List[str] = []
+        index: Dict[str, int] = {}
+        starts, ends, ids = [], [], []
+        for start, end, exe in conn.execute(
+            "SELECT start_ts, end_ts, exe FROM intervals WHERE day = ? ORDER BY seq", (day,)
+        ):
+            if exe not in index:
+                index[exe] = len(apps)
+                apps.append(exe)
+            starts.append(start)
+            ends.append(end)
+            ids.append(index[exe])
+        return {
+            "day": day,
+            "active_seconds": row[0],
+            "per_app": per_app,
+            "per_app_errors": errors,
+            "per_exe": per_exe,
+            "timeline": {"apps": apps, "start": starts, "end": ends, "app": ids},
+            "journal_seq": row[1],
+        }
+
+    def day_names(self, start: Optional[date] = None, end: Optional[date] = None) -> List[str]:
+        rows = self._conn().execute("SELECT day FROM days WHERE day BETWEEN ? AND ? ORDER BY day", _bounds(start, end))
+        return [day for (day,) in rows]
+
+    def iter_days(self, start: Optional[date] = None, end: Optional[date] = None) -> Iterator[Tuple[str, Dict]]:
+        for day in self.day_names(start, end):
+            data = self.read_day(day)
+            if data is not None:
+                yield day, data
+
+    def usage(self, start: date, end: date) -> Tuple[float, Dict[str, float]]:
+        """Active seconds and per-executable seconds over ``start``..``end`` inclusive."""
+        conn = self._conn()
+        bounds = _bounds(start, end)
+        (active,) = conn.execute(
+            "SELECT COALESCE(SUM(active_seconds), 0) FROM days WHERE day BETWEEN ? AND ?", bounds
+        ).fetchone()
+        per_exe = dict(
+            conn.execute("SELECT exe, SUM(seconds) FROM exes WHERE day BETWEEN ? AND ? GROUP BY exe", bounds)
+        )
+        return active, per_exe
+
+    def top_exes(self, start: date, end: date, n: int) -> List[Tuple[str, float]]:
+        rows = self._conn().execute(
+            "SELECT exe, SUM(seconds) AS total FROM exes WHERE day BETWEEN ? AND ? "
+            "GROUP BY exe ORDER BY total DESC LIMIT ?",
+            (*_bounds(start, end), n),
+        )
+        return [(exe, total) for exe, total in rows]
+
+    def migrate_json(self, source: JsonDayStore) -> int:
+        """Import the JSON day files once; days already in the database are kept. Returns days imported."""
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM meta WHERE key = ?", (MIGRATED_KEY,)).fetchone():
+            return 0
+        imported = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = {day for (day,) in conn.execute("SELECT day FROM days")}
+            for day, data in source.iter_days():
+                if day in existing:
+                    continue
+                data = dict(data, day=day)
+                self._write(conn, data, full=True)
+                imported += 1
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (MIGRATED_KEY, str(imported)))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return imported
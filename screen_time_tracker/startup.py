@@ -0,0 +1,135 @@
+"""Startup timing: named init stages and, on request, per-module import times.
+
+Stage timing is two ``perf_counter`` calls and is always on. Import tracing
+puts a finder in front of ``sys.meta_path`` that wraps each module's loader,
+so it is only installed for ``main.py --startup-profile``.
+"""
+
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class _TimedLoader:
+    """Delegating loader that measures ``exec_module`` (cumulative and self time)."""
+
+    def __init__(self, loader, name: str, tracer: "_ImportTracer") -> None:
+        self._loader = loader
+        self._name = name
+        self._tracer = tracer
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        tracer = self._tracer
+        stack = tracer.stack()
+        stack.append(0.0)
+        began = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            cumulative = time.perf_counter() - began
+            nested = stack.pop()
+            if stack:
+                stack[-1] += cumulative
+            tracer.imports[self._name] = (cumulative, cumulative - nested)
+
+
+class _ImportTracer:
+    def __init__(self) -> None:
+        self.imports: Dict[str, tuple] = {}
+        self._local = threading.local()
+
+    def stack(self) -> List[float]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimedLoader(spec.loader, name, self)
+            return spec
+        return None
+
+
+class StartupProfile:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: List[Dict] = []
+        self._tracer: Optional[_ImportTracer] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            ended = time.perf_counter()
+            with self._lock:
+                self.stages.append(
+                    {
+                        "stage": name,
+                        "thread": threading.current_thread().name,
+                        "start": round(began - self.started, 4),
+                        "seconds": round(ended - began, 4),
+                    }
+                )
+
+    def trace_imports(self) -> None:
+        """Time every module imported from now on (slows imports slightly)."""
+        if self._tracer is None:
+            self._tracer = _ImportTracer()
+            sys.meta_path.insert(0, self._tracer)
+
+    def stop_tracing(self) -> None:
+        if self._tracer is not None and self._tracer in sys.meta_path:
+            sys.meta_path.remove(self._tracer)
+
+    def report(self, top: int = 30) -> Dict:
+        imports = []
+        if self._tracer is not None:
+            ranked = sorted(self._tracer.imports.items(), key=lambda item: item[1][0], reverse=True)
+            imports = [
+                {"module": name, "cumulative": round(cumulative, 4), "self": round(own, 4)}
+                for name, (cumulative, own) in ranked[:top]
+            ]
+        with self._lock:
+            stages = list(self.stages)
+        return {
+            "total_seconds": round(time.perf_counter() - self.started, 4),
+            "stages": stages,
+            "imports": imports,
+        }
+
+    def format(self, top: int = 30) -> str:
+        report = self.report(top)
+        lines = [f"startup: {report['total_seconds'] * 1000:.0f} ms", "", "stages (ms):"]
+        for stage in report["stages"]:
+            lines.append(
+                f"  {stage['start'] * 1000:8.1f} +{stage['seconds'] * 1000:8.1f}  {stage['stage']} [{stage['thread']}]"
+            )
+        if report["imports"]:
+            lines += ["", "imports (ms, cumulative / self):"]
+            for entry in report["imports"]:
+                lines.append(f"  {entry['cumulative'] * 1000:8.1f} {entry['self'] * 1000:8.1f}  {entry['module']}")
+        return "\n".join(lines)
+
+    def dumps(self, top: int = 30) -> str:
+        return json.dumps(self.report(top), indent=2)
+
+
+profile = StartupProfile()
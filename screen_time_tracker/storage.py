@@ -0,0 +1,132 @@
+"""Where the tracker keeps finished and checkpointed days.
+
+Days are exchanged as the dict the tracker persists::
+
+    {"day", "active_seconds", "per_app", "per_app_errors", "per_exe", "timeline", "journal_seq"}
+
+:class:`JsonDayStore` writes one ``YYYY-MM-DD.json`` per day (the original
+layout). :class:`~screen_time_tracker.sqlite_store.SqliteDayStore` keeps the
+same data in indexed SQLite tables, so cross-day questions are index range
+scans instead of reading every file; it is imported only when selected.
+"""
+
+import json
+import os
+import re
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+JSON = "json"
+SQLITE = "sqlite"
+AUTO = "auto"
+BACKENDS = (JSON, SQLITE)
+SQLITE_FILENAME = "usage.sqlite3"
+
+DAY_FILE_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})\.json$")
+
+
+def _bounds(start: Optional[date], end: Optional[date]) -> Tuple[str, str]:
+    return (start.isoformat() if start else "", end.isoformat() if end else "9999-99-99")
+
+
+def _fsync_dir(path: Path) -> None:
+    """Persist a rename in ``path`` (POSIX; Windows has no directory handles to sync)."""
+    if os.name != "posix":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class DayStore:
+    # True when range queries (usage/top_exes) are answered from an index.
+    indexed = False
+
+    def read_day(self, day: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def write_day(self, data: Dict) -> bool:
+        """Replace ``data["day"]`` atomically and durably; returns False instead of raising on errors.
+
+        The tracker truncates its journal once this returns True, so the day
+        must be on disk by then.
+        """
+        raise NotImplementedError
+
+    def iter_days(self, start: Optional[date] = None, end: Optional[date] = None) -> Iterator[Tuple[str, Dict]]:
+        """``(day, data)`` for every stored day in ``start``..``end`` inclusive, oldest first, one at a time."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class JsonDayStore(DayStore):
+    def __init__(self, data_dir: Path) -> None:
+        self.data_dir = data_dir
+
+    def path(self, day: str) -> Path:
+        return self.data_dir / f"{day}.json"
+
+    def read_day(self, day: str) -> Optional[Dict]:
+        try:
+            return json.loads(self.path(day).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def write_day(self, data: Dict) -> bool:
+        path = self.path(data["day"])
+        tmp = path.with_suffix(".json.tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as handle:
+                handle.write(json.dumps(data, indent=2))
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(tmp, path)
+            _fsync_dir(self.data_dir)
+            return True
+        except Exception:
+            # Best effort; avoid crashing tracker
+            return False
+
+    def day_names(self, start: Optional[date] = None, end: Optional[date] = None) -> List[str]:
+        first, last = _bounds(start, end)
+        try:
+            names = [match.group(1) for match in map(DAY_FILE_RE.match, os.listdir(self.data_dir)) if match]
+        except OSError:
+            return []
+        return sorted(day for day in names if first <= day <= last)
+
+    def iter_days(self, start: Optional[date] = None, end: Optional[date] = None) -> Iterator[Tuple[str, Dict]]:
+        for day in self.day_names(start, end):
+            data = self.read_day(day)
+            if data is not None:
+                yield day, data
+
+
+def open_store(data_dir: Path, backend: str = JSON, readonly: bool = False) -> DayStore:
+    """Open the day store in ``data_dir``; ``auto`` picks SQLite if its database already exists.
+
+    The first time SQLite is opened over a directory of JSON day files they
+    are imported once; the files are left in place. Readers (``readonly``)
+    never create the database or migrate; a missing one raises ``ValueError``.
+    """
+    db_path = data_dir / SQLITE_FILENAME
+    if backend == AUTO:
+        backend = SQLITE if db_path.exists() else JSON
+    if backend == SQLITE:
+        from .sqlite_store import SqliteDayStore
+
+        if readonly:
+            if not db_path.exists():
+                raise ValueError(f"No SQLite history database at {db_path}")
+            return SqliteDayStore(db_path, readonly=True)
+        store = SqliteDayStore(db_path)
+        store.migrate_json(JsonDayStore(data_dir))
+        return store
+    if backend != JSON:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    return JsonDayStore(data_dir)
@@ -0,0 +1,109 @@
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class DayTimeline:
+    """Column store of (start, end, app-id) activity intervals for one day.
+
+    Timestamps are epoch seconds kept in ``array('d')`` columns and app names
+    are interned into small integer ids, so a full day costs a few bytes per
+    merged run rather than a Python object per second. Adjacent intervals for
+    the same app are merged when the gap between them is at most ``merge_gap``.
+    """
+
+    def __init__(self, merge_gap: float = 2.0) -> None:
+        self.merge_gap = merge_gap
+        self.starts = array("d")
+        self.ends = array("d")
+        self.app_ids = array("I")
+        self.apps: List[str] = []
+        self._app_index: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def app_id(self, app: str) -> int:
+        idx = self._app_index.get(app)
+        if idx is None:
+            idx = len(self.apps)
+            self.apps.append(app)
+            self._app_index[app] = idx
+        return idx
+
+    def add(self, start: float, end: float, app: str) -> None:
+        if end <= start:
+            return
+        idx = self.app_id(app)
+        if self.starts and self.app_ids[-1] == idx and start - self.ends[-1] <= self.merge_gap:
+            if end > self.ends[-1]:
+                self.ends[-1] = end
+            return
+        self.starts.append(start)
+        self.ends.append(end)
+        self.app_ids.append(idx)
+
+    def extend(self, intervals: Iterable[Tuple[float, float, str]]) -> None:
+        for start, end, app in intervals:
+            self.add(start, end, app)
+
+    def copy(self) -> "DayTimeline":
+        clone = DayTimeline(self.merge_gap)
+        clone.starts = array("d", self.starts)
+        clone.ends = array("d", self.ends)
+        clone.app_ids = array("I", self.app_ids)
+        clone.apps = list(self.apps)
+        clone._app_index = dict(self._app_index)
+        return clone
+
+    def intervals(self) -> Iterable[Tuple[float, float, str]]:
+        apps = self.apps
+        for start, end, idx in zip(self.starts, self.ends, self.app_ids):
+            yield start, end, apps[idx]
+
+    def hourly_seconds(self, day_start: float) -> List[float]:
+        """Active seconds per local hour; ``day_start`` is the epoch of local midnight."""
+        hours = [0.0] * 24
+        for start, end in zip(self.starts, self.ends):
+            offset = max(start - day_start, 0.0)
+            stop = min(end - day_start, 86400.0)
+            while offset < stop:
+                hour = int(offset // 3600)
+                boundary = min((hour + 1) * 3600.0, stop)
+                hours[hour] += boundary - offset
+                offset = boundary
+        return hours
+
+    def sessions(self, gap: float) -> List[Tuple[float, float]]:
+        """Continuous sessions across apps, splitting wherever input paused longer than ``gap``."""
+        result: List[Tuple[float, float]] = []
+        current: Optional[List[float]] = None
+        for start, end in zip(self.starts, self.ends):
+            if current is not None and start - current[1] <= gap:
+                if end > current[1]:
+                    current[1] = end
+                continue
+            if current is not None:
+                result.append((current[0], current[1]))
+            current = [start, end]
+        if current is not None:
+            result.append((current[0], current[1]))
+        return result
+
+    def longest_session(self, gap: float) -> float:
+        return max((end - start for start, end in self.sessions(gap)), default=0.0)
+
+    def to_dict(self) -> Dict:
+        return {
+            "apps": list(self.apps),
+            "start": self.starts.tolist(),
+            "end": self.ends.tolist(),
+            "app": self.app_ids.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, merge_gap: float = 2.0) -> "DayTimeline":
+        timeline = cls(merge_gap)
+        apps = data.get("apps", [])
+        for start, end, idx in zip(data.get("start", []), data.get("end", []), data.get("app", [])):
+            timeline.add(start, end, apps[idx])
+        return timeline
@@ -1,13 +1,19 @@
 import threading
 import time
-from collections import defaultdict
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 import platform
 
-import psutil
+from . import metrics
+from .appstats import AppUsage, exe_of
+from .clock import SystemClock
+from .idle import AUTO, IdleSource, select_idle_source
+from .journal import ActivityJournal
+from .process_cache import ProcessNameCache
+from .storage import DayStore, JsonDayStore
+from .timeline import DayTimeline
 
 try:
     import win32gui
@@ -16,127 +22,463 @@ except Exception:  # pragma: no cover - used only on Windows
     win32gui = None
     win32process = None
 
-try:
-    from pynput import keyboard, mouse
-except ImportError:  # pragma: no cover - optional for environments without pynput
-    keyboard = None
-    mouse = None
+
+# While the user is active the foreground window is sampled at this rate so
+# per-app attribution stays accurate to the second.
+ACTIVE_TICK_SECONDS = 1.0
+# Default coalescing window for raw input events, in seconds.
+INPUT_COALESCE_SECONDS = 0.5
+TICK_SECONDS = metrics.registry.histogram("tick_seconds", "Duration of one tracker tick")
+FOREGROUND_SECONDS = metrics.registry.histogram(
+    "foreground_lookup_seconds", "Latency of resolving the foreground app name"
+)
+
+# Distinct "{exe} - {title}" keys kept per day, and how many reach snapshots.
+APP_KEY_CAPACITY = 500
+SNAPSHOT_TOP_APPS = 50
+# How often today's totals are written atomically so the journal can be truncated.
+CHECKPOINT_SECONDS = 600.0
 
 
-@dataclass
+@dataclass(frozen=True)
 class ActivitySnapshot:
+    """Point-in-time totals. Shared between readers, so treat the containers as read-only."""
+
     active_seconds: float
     per_app_seconds: Dict[str, float]
     day: date
+    timeline: Optional[DayTimeline] = None
+    per_exe_seconds: Optional[Dict[str, float]] = None
+    # Set for multi-day aggregates; ``day`` is then the first day of the range.
+    end_day: Optional[date] = None
+    # Increases with every change to the tracker's live totals; 0 for history aggregates.
+    version: int = 0
+
+
+class ActivitySignal:
+    """Per-listener input sink that forwards at most one update per window.
+
+    Listener threads call :meth:`hit` for every raw event; only the first event
+    in each coalescing window reaches the tracker, the rest just bump a counter.
+    """
+
+    __slots__ = ("name", "window", "last", "raw", "coalesced", "_on_update", "_now")
+
+    def __init__(
+        self,
+        name: str,
+        window: float,
+        on_update: Callable[[float], None],
+        now: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.window = window
+        self.last = 0.0
+        self.raw = 0
+        self.coalesced = 0
+        self._on_update = on_update
+        self._now = now
+
+    def hit(self, *args, **kwargs) -> None:
+        self.raw += 1
+        now = self._now()
+        if now - self.last < self.window:
+            self.coalesced += 1
+            return
+        self.last = now
+        self._on_update(now)
 
 
 class ActivityTracker:
-    def __init__(self, idle_minutes: int, data_dir: Path):
+    def __init__(
+        self,
+        idle_minutes: int,
+        data_dir: Path,
+        input_window: float = INPUT_COALESCE_SECONDS,
+        app_capacity: int = APP_KEY_CAPACITY,
+        top_apps: int = SNAPSHOT_TOP_APPS,
+        clock=None,
+        app_source: Optional[Callable[[], str]] = None,
+        idle_source: Optional[IdleSource] = None,
+        idle_source_name: str = AUTO,
+        store: Optional[DayStore] = None,
+    ):
+        # Injectable for tests and benchmarks; app_source replaces the foreground-window lookup.
+        self.clock = clock or SystemClock()
+        self._app_source = app_source or self._active_app_name
+        # Chosen in start() unless injected; see idle.select_idle_source.
+        self.idle_source = idle_source
+        self.idle_source_name = idle_source_name
         self.idle_threshold = timedelta(minutes=idle_minutes)
-        self.last_activity: datetime = datetime.now()
-        self.last_tick: datetime = datetime.now()
+        # Monotonic timestamps: immune to wall-clock jumps, so accumulation stays exact.
+        self.last_activity: float = self.clock.monotonic()
+        self.last_tick: float = self.clock.monotonic()
         self.active_seconds_today: float = 0.0
-        self.per_app_seconds: Dict[str, float] = defaultdict(float)
+        self.app_capacity = app_capacity
+        self.top_apps = top_apps
+        self.app_usage = AppUsage(app_capacity)
+        self.timeline = DayTimeline()
         self.running = False
+        self.idle = False
+        # Current gap between idle polls of a pull source; reset once the user is active.
+        self._idle_poll = 0.0
         self.lock = threading.Lock()
-        self.current_day = date.today()
+        self.current_day = self._today()
         self.data_dir = data_dir
-        self.listeners = []
+        self.store = store or JsonDayStore(data_dir)
+        self.input_window = input_window
+        self.signals: Dict[str, ActivitySignal] = {}
+        self.wakeups = 0
+        self.process_names = ProcessNameCache()
+        self.foreground_skips = 0
+        self._last_foreground: Optional[tuple] = None
+        self._last_app_name = "unknown"
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._subscribers: list = []
+        self.journal = ActivityJournal(data_dir / "journal.log", clock=self.clock)
+        self.checkpoint_interval = CHECKPOINT_SECONDS
+        self._last_checkpoint = self.clock.monotonic()
+        self.version = 0
+        self._published = self._build_snapshot()
+        self._register_metrics()
+
+    def subscribe(self, callback: Callable[[str, str, float, float, float], None]) -> None:
+        """Call ``callback(day, app, seconds, wall_start, wall_end)`` for every credited delta.
+
+        Runs on the tick thread outside the tick lock, so callbacks must be quick.
+        """
+        self._subscribers.append(callback)
+
+    def _register_metrics(self) -> None:
+        # Callback metrics read existing counters at export time, so the hot paths pay nothing.
+        registry = metrics.registry
+        registry.counter(
+            "input_events_total",
+            "Raw input events seen by the listeners",
+            fn=lambda: sum(signal.raw for signal in self.signals.values()),
+        )
+        registry.counter(
+            "input_events_coalesced_total",
+            "Input events absorbed by coalescing",
+            fn=lambda: sum(signal.coalesced for signal in self.signals.values()),
+        )
+        registry.counter("tick_wakeups_total", "Tick loop wakeups", fn=lambda: self.wakeups)
+        registry.gauge("per_app_keys", "Distinct app keys tracked today", fn=lambda: len(self.app_usage))
+        registry.gauge("timeline_runs", "Merged intervals in today's timeline", fn=lambda: len(self.timeline))
+        registry.gauge("active_seconds_today", "Active seconds today", fn=lambda: self.active_seconds_today)
+        registry.counter("process_cache_hits_total", "Process name cache hits", fn=lambda: self.process_names.hits)
+        registry.counter(
+            "process_cache_misses_total", "Process name cache misses", fn=lambda: self.process_names.misses
+        )
 
     def start(self) -> None:
         self.running = True
         self.data_dir.mkdir(parents=True, exist_ok=True)
-        self._start_listeners()
-        threading.Thread(target=self._tick_loop, daemon=True).start()
+        self.recover()
+        self.last_tick = self.clock.monotonic()
+        if self.idle_source is None:
+            self.idle_source = select_idle_source(self.idle_source_name, self)
+        else:
+            self.idle_source.start(self)
+        self._thread = threading.Thread(target=self._tick_loop, name="tick", daemon=True)
+        self._thread.start()
 
     def stop(self) -> None:
         self.running = False
-        for listener in self.listeners:
-            try:
-                listener.stop()
-            except Exception:
+        self._wake.set()
+        if self.idle_source is not None:
+            self.idle_source.stop()
+        # The tick thread flushes the journal outside the lock; a flush that lands after the
+        # final checkpoint read journal.seq would be replayed on top of it and counted twice.
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        with self.lock:
+            self._checkpoint()
+        self.journal.close()
+
+    def recover(self) -> None:
+        """Rebuild today's totals from the last checkpoint plus the journal tail."""
+        today = self.current_day.isoformat()
+        days: Dict[str, dict] = {}
+        for record in self.journal.replay():
+            day = record.get("day")
+            if day not in days:
+                days[day] = self._load_day(day)
+            state = days[day]
+            if record["seq"] <= state["journal_seq"]:
                 continue
+            state["journal_seq"] = record["seq"]
+            state["active_seconds"] += record.get("active", 0.0)
+            for app, seconds in record.get("apps", {}).items():
+                state["app_usage"].add(app, seconds)
+            state["timeline"].extend(record.get("iv", []))
+        if today not in days:
+            days[today] = self._load_day(today)
+        # Keep sequence numbers increasing across restarts, even with an empty journal.
+        self.journal.seq = max([self.journal.seq] + [state["journal_seq"] for state in days.values()])
+        with self.lock:
+            persisted = True
+            for day, state in days.items():
+                if day == today:
+                    self.active_seconds_today = state["active_seconds"]
+                    self.app_usage = state["app_usage"]
+                    self.timeline = state["timeline"]
+                else:
+                    # Journal tail of a day that never got its rollover checkpoint.
+                    persisted &= self._write_day(day, state["active_seconds"], state["app_usage"], state["timeline"])
+            # Keep the journal if any earlier day could not be written; it is replayed again next start.
+            self._checkpoint(truncate=persisted)
+            self._publish()
+
+    def _load_day(self, day: str) -> dict:
+        state = {
+            "active_seconds": 0.0,
+            "app_usage": AppUsage(self.app_capacity),
+            "journal_seq": 0,
+            "timeline": DayTimeline(),
+        }
+        data = self.store.read_day(day)
+        if data is None:
+            return state
+        state["active_seconds"] = float(data.get("active_seconds", 0.0))
+        state["app_usage"] = AppUsage.from_dict(data, self.app_capacity)
+        state["journal_seq"] = int(data.get("journal_seq", 0))
+        if data.get("timeline"):
+            state["timeline"] = DayTimeline.from_dict(data["timeline"])
+        return state
+
+    def _signal(self, name: str) -> ActivitySignal:
+        signal = ActivitySignal(name, self.input_window, self._on_input, self.clock.monotonic)
+        self.signals[name] = signal
+        return signal
+
+    def set_idle_minutes(self, minutes: float) -> None:
+        self.idle_threshold = timedelta(minutes=minutes)
+        # The tick loop may be sleeping towards the old idle edge.
+        self._wake.set()
 
-    def _start_listeners(self) -> None:
-        if keyboard:
-            kb_listener = keyboard.Listener(on_press=self._on_input, on_release=self._on_input)
-            kb_listener.start()
-            self.listeners.append(kb_listener)
-        if mouse:
-            mouse_listener = mouse.Listener(on_move=self._on_input, on_click=self._on_input, on_scroll=self._on_input)
-            mouse_listener.start()
-            self.listeners.append(mouse_listener)
+    def set_input_window(self, seconds: float) -> None:
+        self.input_window = seconds
+        for signal in self.signals.values():
+            signal.window = seconds
 
-    def _on_input(self, *args, **kwargs):
-        self.last_activity = datetime.now()
+    def input_stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {"raw": signal.raw, "coalesced": signal.coalesced, "delivered": signal.raw - signal.coalesced}
+            for name, signal in self.signals.items()
+        }
+
+    def _on_input(self, now: Optional[float] = None) -> None:
+        self.last_activity = now if now is not None else self.clock.monotonic()
+        if self.idle:
+            # Only the idle -> active edge needs to wake the tick loop early.
+            self._wake.set()
+
+    def _poll_idle(self, now: float) -> None:
+        source = self.idle_source
+        if source is None or not source.pull:
+            return
+        idle = source.idle_seconds()
+        if idle is not None and now - idle > self.last_activity:
+            self.last_activity = now - idle
+
+    def is_idle(self) -> bool:
+        return self.clock.monotonic() - self.last_activity >= self.idle_threshold.total_seconds()
 
     def _tick_loop(self) -> None:
         while self.running:
+            began = time.perf_counter()
             self._tick()
-            time.sleep(1)
+            TICK_SECONDS.observe(time.perf_counter() - began)
+            self.wakeups += 1
+            timeout = self._next_deadline()
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _next_deadline(self) -> float:
+        """Seconds until the next moment the tick loop has something to do."""
+        until_midnight = self._seconds_until_midnight()
+        if self.idle:
+            # Nothing accrues while idle: sleep until input wakes us or the day rolls over.
+            deadline = until_midnight
+            source = self.idle_source
+            if source is not None and source.pull:
+                # Polled sources cannot wake us; look for the idle -> active edge, less often the
+                # longer the break lasts (doubling up to the idle threshold).
+                ceiling = max(self.idle_threshold.total_seconds(), source.poll_interval)
+                self._idle_poll = min(max(self._idle_poll * 2, source.poll_interval), ceiling)
+                deadline = min(deadline, self._idle_poll)
+            if self.journal.has_pending:
+                deadline = min(deadline, self.journal.seconds_until_flush())
+            return max(deadline, 0.0)
+        self._idle_poll = 0.0
+        idle_edge = self.last_activity + self.idle_threshold.total_seconds() - self.clock.monotonic()
+        return max(min(ACTIVE_TICK_SECONDS, idle_edge, until_midnight), 0.0)
+
+    def _today(self) -> date:
+        return date.fromtimestamp(self.clock.time())
+
+    def _seconds_until_midnight(self) -> float:
+        now = datetime.fromtimestamp(self.clock.time())
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        return (midnight - now).total_seconds() + 0.001
 
     def _tick(self) -> None:
-        now = datetime.now()
-        idle = (now - self.last_activity) > self.idle_threshold
-        delta = (now - self.last_tick).total_seconds()
-        if delta < 0:
-            delta = 0
-        if now.date() != self.current_day:
-            self._rollover(now.date())
-        if not idle:
-            app_name = self._active_app_name()
+        now = self.clock.monotonic()
+        self._poll_idle(now)
+        # Credit time up to the idle edge (or now, if input is recent). Coming back from idle,
+        # credit starts at the input that ended it, not at the (possibly long past) last tick.
+        active_until = min(now, self.last_activity + self.idle_threshold.total_seconds())
+        since = max(self.last_tick, self.last_activity) if self.idle else self.last_tick
+        delta = active_until - since
+        if delta > 0:
+            began = time.perf_counter()
+            app_name = self._app_source()
+            FOREGROUND_SECONDS.observe(time.perf_counter() - began)
+            # Map the monotonic span onto wall-clock time for the timeline.
+            wall_end = self.clock.time() - (now - active_until)
+            wall_start = wall_end - delta
             with self.lock:
                 self.active_seconds_today += delta
-                self.per_app_seconds[app_name] += delta
+                self.app_usage.add(app_name, delta)
+                # The timeline is keyed by executable so its app table stays small.
+                self.timeline.add(wall_start, wall_end, exe_of(app_name))
+                day = self.current_day.isoformat()
+                self.journal.record(day, app_name, delta, wall_start, wall_end)
+                self._publish()
+            for callback in self._subscribers:
+                try:
+                    callback(day, app_name, delta, wall_start, wall_end)
+                except Exception:
+                    pass
+        self.idle = now - self.last_activity >= self.idle_threshold.total_seconds()
         self.last_tick = now
+        today = self._today()
+        if today != self.current_day:
+            self._rollover(today)
+        elif now - self._last_checkpoint >= self.checkpoint_interval:
+            with self.lock:
+                self._checkpoint()
+        else:
+            try:
+                self.journal.maybe_flush(now)
+            except OSError:
+                pass
 
     def _rollover(self, new_day: date) -> None:
         with self.lock:
-            self._persist_day()
+            self._checkpoint()
             self.active_seconds_today = 0.0
-            self.per_app_seconds = defaultdict(float)
+            self.app_usage = AppUsage(self.app_capacity)
+            self.timeline = DayTimeline()
             self.current_day = new_day
+            self._publish()
 
-    def _persist_day(self) -> None:
-        import json
+    def _checkpoint(self, truncate: bool = True) -> None:
+        """Persist the day atomically and truncate the journal it supersedes. Caller holds the lock.
+
+        The journal is only truncated after the store reports the day durably written.
+        """
+        self._last_checkpoint = self.clock.monotonic()
+        if self._persist_day() and truncate:
+            self.journal.discard_pending()
+            try:
+                self.journal.truncate()
+            except OSError:
+                pass
 
+    def _persist_day(self) -> bool:
+        return self._write_day(
+            self.current_day.isoformat(), self.active_seconds_today, self.app_usage, self.timeline
+        )
+
+    def _write_day(self, day: str, active_seconds: float, app_usage: AppUsage, timeline: DayTimeline) -> bool:
         data = {
-            "day": self.current_day.isoformat(),
-            "active_seconds": self.active_seconds_today,
-            "per_app": self.per_app_seconds,
+            "day": day,
+            "active_seconds": active_seconds,
+            **app_usage.to_dict(),
+            "timeline": timeline.to_dict(),
+            "journal_seq": self.journal.seq,
         }
-        path = self.data_dir / f"{self.current_day.isoformat()}.json"
-        try:
-            path.write_text(json.dumps(data, indent=2), encoding="utf-8")
-        except Exception:
-            # Best effort; avoid crashing tracker
-            pass
+        return self.store.write_day(data)
 
     def _active_app_name(self) -> str:
         if platform.system() != "Windows" or not win32gui or not win32process:
             return "unknown"
         try:
             hwnd = win32gui.GetForegroundWindow()
-            thread_id, pid = win32process.GetWindowThreadProcessId(hwnd)
-            proc = psutil.Process(pid)
-            name = proc.name()
             window_title = win32gui.GetWindowText(hwnd)
-            if window_title:
-                return f"{name} - {window_title[:40]}"
-            return name
+            foreground = (hwnd, window_title)
+            if foreground == self._last_foreground:
+                # Same window, same title: the resolved name cannot have changed.
+                self.foreground_skips += 1
+                return self._last_app_name
+            thread_id, pid = win32process.GetWindowThreadProcessId(hwnd)
+            name = self.process_names.name(pid)
+            app_name = f"{name} - {window_title[:40]}" if window_title else name
+            self._last_foreground = foreground
+            self._last_app_name = app_name
+            return app_name
         except Exception:
+            self._last_foreground = None
             return "unknown"
 
+    def lookup_stats(self) -> Dict[str, int]:
+        stats = self.process_names.stats()
+        stats["foreground_skips"] = self.foreground_skips
+        return stats
+
     def snapshot(self) -> ActivitySnapshot:
+        """Snapshot of the current ``version``.
+
+        Ticks only bump the version; the copy is made here, once per version,
+        when a reader first asks for it. Repeat reads of an unchanged version
+        are lock-free.
+        """
+        snap = self._published
+        if snap.version == self.version:
+            return snap
         with self.lock:
-            return ActivitySnapshot(
-                active_seconds=self.active_seconds_today,
-                per_app_seconds=dict(self.per_app_seconds),
-                day=self.current_day,
-            )
+            if self._published.version != self.version:
+                # A single reference swap: lock-free readers see either the old or the new snapshot.
+                self._published = self._build_snapshot()
+            return self._published
+
+    def day_snapshot(self, day: date) -> ActivitySnapshot:
+        """Totals for ``day``: the live snapshot while it is still the tracked day, else the stored one."""
+        snap = self.snapshot()
+        if day == snap.day:
+            return snap
+        state = self._load_day(day.isoformat())
+        return ActivitySnapshot(
+            active_seconds=state["active_seconds"],
+            per_app_seconds=state["app_usage"].top(self.top_apps),
+            day=day,
+            timeline=state["timeline"],
+            per_exe_seconds=dict(state["app_usage"].per_exe),
+        )
+
+    def _build_snapshot(self) -> ActivitySnapshot:
+        return ActivitySnapshot(
+            active_seconds=self.active_seconds_today,
+            per_app_seconds=self.app_usage.top(self.top_apps),
+            day=self.current_day,
+            timeline=self.timeline.copy(),
+            per_exe_seconds=dict(self.app_usage.per_exe),
+            version=self.version,
+        )
+
+    def _publish(self) -> None:
+        """Mark the live state changed; :meth:`snapshot` copies it on demand. Caller holds the lock."""
+        self.version += 1
 
     def reset_today(self) -> None:
         with self.lock:
             self.active_seconds_today = 0.0
-            self.per_app_seconds = defaultdict(float)
-            self.current_day = date.today()
+            self.app_usage = AppUsage(self.app_capacity)
+            self.timeline = DayTimeline()
+            self.current_day = self._today()
+            self._checkpoint()
+            self._publish()
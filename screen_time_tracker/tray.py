@@ -23,7 +23,34 @@ def _create_icon():
     return image
 
 
-def start_tray(on_send_report, on_exit, data_dir: Path, language: str = "en"):
+def _menu(on_send_report, on_exit, data_dir: Path, language: str, on_profile=None):
+    items = [
+        pystray.MenuItem(
+            t("tray_send_now", language),
+            lambda icon, item: _run_async(on_send_report),
+        ),
+        pystray.MenuItem(
+            t("tray_open_folder", language),
+            lambda icon, item: webbrowser.open(str(data_dir)),
+        ),
+    ]
+    if on_profile is not None:
+        items.append(
+            pystray.MenuItem(
+                t("tray_profile", language),
+                lambda icon, item: on_profile(),
+            )
+        )
+    items.append(
+        pystray.MenuItem(
+            t("tray_exit", language),
+            lambda icon, item: _safe_exit(icon, on_exit),
+        )
+    )
+    return pystray.Menu(*items)
+
+
+def start_tray(on_send_report, on_exit, data_dir: Path, language: str = "en", on_profile=None):
     if not pystray or not Image:
         return None
 
@@ -31,26 +58,22 @@ def start_tray(on_send_report, on_exit, data_dir: Path, language: str = "en"):
         "screen_time_tracker",
         _create_icon(),
         t("tray_title", language),
-        menu=pystray.Menu(
-            pystray.MenuItem(
-                t("tray_send_now", language),
-                lambda icon, item: _run_async(on_send_report),
-            ),
-            pystray.MenuItem(
-                t("tray_open_folder", language),
-                lambda icon, item: webbrowser.open(str(data_dir)),
-            ),
-            pystray.MenuItem(
-                t("tray_exit", language),
-                lambda icon, item: _safe_exit(icon, on_exit),
-            ),
-        ),
+        menu=_menu(on_send_report, on_exit, data_dir, language, on_profile),
     )
 
     threading.Thread(target=icon.run, daemon=True).start()
     return icon
 
 
+def rebuild_tray_menu(icon, on_send_report, on_exit, data_dir: Path, language: str = "en", on_profile=None):
+    """Swap the menu and title of a running tray icon, e.g. after a language change."""
+    if icon is None or not pystray:
+        return
+    icon.menu = _menu(on_send_report, on_exit, data_dir, language, on_profile)
+    icon.title = t("tray_title", language)
+    icon.update_menu()
+
+
 def _run_async(func):
     threading.Thread(target=func, daemon=True).start()
 
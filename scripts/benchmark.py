@@ -0,0 +1,212 @@
+"""Benchmark and soak harness for ActivityTracker.
+
+Replays a synthetic (or recorded) input stream against the tracker on an
+accelerated fake clock, with no pynput or win32 needed, and prints a JSON
+document of timings that can be diffed across versions.
+
+    python scripts/benchmark.py --days 7 --rate 20 --output bench.json
+
+A recorded stream is a text file of ``<seconds-since-start> <app>`` lines;
+every line is one input event in that app.
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from screen_time_tracker.clock import FakeClock  # noqa: E402
+from screen_time_tracker.report_render import ReportRenderer  # noqa: E402
+from screen_time_tracker.tracker import ActivityTracker  # noqa: E402
+
+
+def synthetic_events(args, start: float) -> Iterator[Tuple[float, str]]:
+    """Input events during active hours, with a pause every hour and app switches."""
+    rng = random.Random(args.seed)
+    exes = [f"app{i}.exe" for i in range(args.apps)]
+    app = exes[0]
+    next_switch = 0.0
+    for day in range(args.days):
+        day_start = start + day * 86400 + args.first_hour * 3600
+        for hour in range(args.active_hours):
+            t = day_start + hour * 3600
+            session_end = t + 3600 - args.break_minutes * 60
+            while t < session_end:
+                if t >= next_switch:
+                    exe = rng.choice(exes)
+                    app = f"{exe} - title {rng.randrange(args.titles)}" if args.titles else exe
+                    next_switch = t + rng.expovariate(1 / args.switch_seconds)
+                yield t, app
+                t += rng.expovariate(args.rate)
+
+
+def recorded_events(path: Path, start: float) -> Iterator[Tuple[float, str]]:
+    with open(path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            offset, _, app = line.strip().partition(" ")
+            if offset:
+                yield start + float(offset), app or "unknown"
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)], 3)
+
+
+def usage_bytes(tracker: ActivityTracker) -> int:
+    """Approximate memory held by today's per-app accounting and timeline."""
+    usage = tracker.app_usage
+    total = sys.getsizeof(usage.counts) + sys.getsizeof(usage.errors) + sys.getsizeof(usage.per_exe)
+    total += sum(sys.getsizeof(key) for key in usage.counts)
+    timeline = tracker.timeline
+    for column in (timeline.starts, timeline.ends, timeline.app_ids):
+        total += column.buffer_info()[1] * column.itemsize
+    total += sum(sys.getsizeof(app) for app in timeline.apps)
+    return total
+
+
+def run(args, data_dir: Path) -> dict:
+    start = datetime.combine(datetime.now().date() - timedelta(days=args.days + 1), datetime.min.time()).timestamp()
+    clock = FakeClock(start)
+    current = {"app": "unknown"}
+    tracker = ActivityTracker(
+        args.idle_minutes,
+        data_dir,
+        input_window=args.coalesce_ms / 1000,
+        clock=clock,
+        app_source=lambda: current["app"],
+    )
+    tracker.data_dir.mkdir(parents=True, exist_ok=True)
+    tracker.recover()
+    tracker.last_tick = clock.monotonic()
+    signal = tracker._signal("synthetic")
+    renderer = ReportRenderer()
+
+    events = recorded_events(Path(args.replay), start) if args.replay else synthetic_events(args, start)
+    end = start + args.days * 86400
+    callback_ns = []
+    event_count = 0
+    ticks = 0
+    checkpoint_ms, rollover_ms, render_ms, memory = [], [], [], []
+
+    original_checkpoint, original_rollover = tracker._checkpoint, tracker._rollover
+
+    def timed_checkpoint():
+        began = time.perf_counter()
+        original_checkpoint()
+        checkpoint_ms.append((time.perf_counter() - began) * 1000)
+
+    def timed_rollover(new_day):
+        snapshot = tracker.snapshot()
+        memory.append(
+            {
+                "day": snapshot.day.isoformat(),
+                "app_keys": len(tracker.app_usage),
+                "timeline_runs": len(tracker.timeline),
+                "approx_bytes": usage_bytes(tracker),
+            }
+        )
+        began = time.perf_counter()
+        renderer.render(snapshot, "both")
+        render_ms.append((time.perf_counter() - began) * 1000)
+        began = time.perf_counter()
+        original_rollover(new_day)
+        rollover_ms.append((time.perf_counter() - began) * 1000)
+
+    tracker._checkpoint = timed_checkpoint
+    tracker._rollover = timed_rollover
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    next_event = next(events, None)
+    deadline = clock.time() + tracker._next_deadline()
+    while clock.time() < end:
+        if next_event is not None and next_event[0] <= deadline:
+            clock.advance(max(next_event[0] - clock.time(), 0.0))
+            current["app"] = next_event[1]
+            was_idle = tracker.idle
+            if event_count % args.latency_sample == 0:
+                began = time.perf_counter_ns()
+                signal.hit()
+                callback_ns.append(time.perf_counter_ns() - began)
+            else:
+                signal.hit()
+            event_count += 1
+            next_event = next(events, None)
+            if not (was_idle and not tracker.is_idle()):
+                # Only the idle -> active edge wakes the real tick loop early.
+                continue
+        else:
+            clock.advance(max(deadline - clock.time(), 0.001))
+        tracker._tick()
+        ticks += 1
+        deadline = clock.time() + tracker._next_deadline()
+    cpu_seconds = time.process_time() - cpu_start
+    wall_seconds = time.perf_counter() - wall_start
+    # Release the journal so the temporary data directory can be removed (Windows).
+    tracker.journal.close()
+
+    simulated_hours = args.days * 24
+    return {
+        "version": 1,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": vars(args),
+        "simulated_hours": simulated_hours,
+        "wall_seconds": round(wall_seconds, 3),
+        "cpu_seconds": round(cpu_seconds, 3),
+        "cpu_ms_per_simulated_hour": round(cpu_seconds * 1000 / simulated_hours, 3),
+        "ticks": ticks,
+        "ticks_per_simulated_hour": round(ticks / simulated_hours, 1),
+        "input_events": event_count,
+        "input": tracker.input_stats().get("synthetic", {}),
+        "callback_ns": {
+            "mean": round(sum(callback_ns) / len(callback_ns), 1) if callback_ns else 0.0,
+            "p50": percentile(callback_ns, 50),
+            "p99": percentile(callback_ns, 99),
+        },
+        "checkpoint_ms": {"count": len(checkpoint_ms), "p50": percentile(checkpoint_ms, 50), "max": round(max(checkpoint_ms, default=0.0), 3)},
+        "rollover_ms": {"count": len(rollover_ms), "p50": percentile(rollover_ms, 50), "max": round(max(rollover_ms, default=0.0), 3)},
+        "render_ms": {"count": len(render_ms), "p50": percentile(render_ms, 50), "max": round(max(render_ms, default=0.0), 3)},
+        "memory": memory,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=7, help="simulated days")
+    parser.add_argument("--rate", type=float, default=20.0, help="input events per second while active")
+    parser.add_argument("--active-hours", type=int, default=6, help="active hours per day")
+    parser.add_argument("--first-hour", type=int, default=9, help="hour the first session starts")
+    parser.add_argument("--break-minutes", type=int, default=10, help="idle pause at the end of each hour")
+    parser.add_argument("--apps", type=int, default=12, help="distinct executables")
+    parser.add_argument("--titles", type=int, default=2000, help="distinct window titles (0 = executable only)")
+    parser.add_argument("--switch-seconds", type=float, default=30.0, help="mean seconds between app switches")
+    parser.add_argument("--idle-minutes", type=int, default=5)
+    parser.add_argument("--coalesce-ms", type=int, default=500)
+    parser.add_argument("--latency-sample", type=int, default=100, help="time every Nth callback")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--replay", help="recorded '<offset> <app>' event file instead of synthetic input")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="stt-bench-") as data_dir:
+        result = json.dumps(run(args, Path(data_dir)), indent=2)
+    if args.output:
+        Path(args.output).write_text(result, encoding="utf-8")
+    else:
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Export usage history to CSV, JSONL or Parquet for analysis in other tools.
+
+    python scripts/export_history.py usage.csv.gz --from 2024-01-01 --to 2024-12-31
+    python scripts/export_history.py usage.parquet --level apps --app chrome.exe --app steam.exe
+    python scripts/export_history.py - --format jsonl --level intervals | head
+
+The format and compression follow the file name unless given explicitly.
+"""
+
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from screen_time_tracker.export import COLUMNS, COMPRESSIONS, EXES, FORMATS, export  # noqa: E402
+from screen_time_tracker.storage import AUTO, BACKENDS, open_store  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out", help="output file, or - for stdout")
+    parser.add_argument("--data-dir", type=Path, default=Path("data"))
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, help="first day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, help="last day (YYYY-MM-DD)")
+    parser.add_argument("--level", choices=sorted(COLUMNS), default=EXES)
+    parser.add_argument("--app", action="append", help="only this executable (repeatable)")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--compression", choices=COMPRESSIONS)
+    parser.add_argument("--storage", choices=(AUTO,) + BACKENDS, default=AUTO, help="day store to read")
+    args = parser.parse_args()
+
+    began = time.perf_counter()
+    try:
+        store = open_store(args.data_dir, args.storage, readonly=True)
+    except ValueError as exc:
+        parser.exit(1, f"export failed: {exc}\n")
+    try:
+        rows = export(
+            args.data_dir, args.out, args.start, args.end, args.level, args.app, args.format, args.compression, store
+        )
+    except (RuntimeError, ValueError) as exc:
+        parser.exit(1, f"export failed: {exc}\n")
+    finally:
+        store.close()
+    print(f"{rows} rows in {time.perf_counter() - began:.2f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
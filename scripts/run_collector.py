@@ -0,0 +1,36 @@
+"""Run the household collector that merges usage from several tracker instances.
+
+    python scripts/run_collector.py --port 8765 --data-dir collector_data
+
+Point each tracker at it with ``TRACKER_HOUSEHOLD_URL=http://<host>:8765``
+and the same ``TRACKER_HOUSEHOLD_CHILD`` on every machine the child uses.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from screen_time_tracker.household import HouseholdCollector  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="address to bind (0.0.0.0 for the whole LAN)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data-dir", type=Path, default=Path("collector_data"))
+    args = parser.parse_args()
+
+    collector = HouseholdCollector(args.data_dir, port=args.port, host=args.host)
+    print(f"Household collector listening on {args.host}:{collector.port}")
+    try:
+        collector.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        collector.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()